@@ -1,16 +1,24 @@
+import time
+# Origine du rapport de démarrage, avant tout import lourd
+START = time.perf_counter()
+
 import subprocess
 import sys
+import threading
 import tkinter as tk
-from PIL import Image, ImageTk
+from concurrent.futures import ThreadPoolExecutor
 import os
 import random
 import numpy as np
-import torch
-import pygame
 
+from asset_cache import photo_images
 from battle_line_env import BattleLineEnv
-from battle_line_game import MAX_HAND_SIZE
-from dqn_agent import DQNAgent
+from battle_line_game import DEFAULT_ENCODER, MAX_HAND_SIZE, encoder_for_dim
+from game_client import RemoteBattleLineEnv
+from profiler import write_json_line
+
+# torch (model_export, ismcts_agent) et pygame sont importés dans le fil de chargement de GameInterface
+IMPORTS_DONE = time.perf_counter()
 
 WINDOW_WIDTH = 1400
 WINDOW_HEIGHT = 730
@@ -27,12 +35,9 @@ TOP_HAND_START_X = 50
 TOP_HAND_Y = 20
 HAND_CARD_SPACING = 80
 
-CARD_COLORS = ["blue", "red", "pink", "yellow", "green", "white"]
-VALUES = list(range(1, 11))
-STATE_DIM = 1836
-ACTION_DIM = 63
 
 def init_music():
+    import pygame
     pygame.mixer.init()
     music_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "music", 
                               "Pokémon Omega Ruby & Alpha Sapphire - Zinnia Battle Music (HQ).mp3")
@@ -43,12 +48,79 @@ def init_music():
     else:
         print("Fichier de musique introuvable :", music_path)
 
+def stop_music():
+    try:
+        import pygame
+        pygame.mixer.music.stop()
+    except Exception:
+        pass
+
+def load_sounds():
+    import pygame
+    try:
+        pygame.mixer.init()
+    except Exception as e:
+        print("Erreur d'initialisation du mixer :", e)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    sounds_dir = os.path.join(script_dir, "music")
+    click_sound = congrats_sound = None
+    click_path = os.path.join(sounds_dir, "Click - Sound Effect (HD).mp3")
+    if os.path.exists(click_path):
+        try:
+            click_sound = pygame.mixer.Sound(click_path)
+        except Exception as e:
+            print("Erreur lors du chargement du son clic :", e)
+    else:
+        print("Fichier click.wav manquant dans le dossier sounds")
+    congrats_path = os.path.join(sounds_dir, "congrats.wav")
+    if os.path.exists(congrats_path):
+        try:
+            congrats_sound = pygame.mixer.Sound(congrats_path)
+        except Exception as e:
+            print("Erreur lors du chargement du son de félicitations :", e)
+    else:
+        print("Fichier congrats.wav manquant dans le dossier sounds")
+    return click_sound, congrats_sound
+
+# Modèle, agent ISMCTS et sons chargés une seule fois par processus : menu.py enchaîne les parties
+# dans la même fenêtre Tk
+_shared = {}
+_shared_locks = {}
+
+def shared(name, factory):
+    with _shared_locks.setdefault(name, threading.Lock()):
+        if name not in _shared:
+            _shared[name] = factory()
+        return _shared[name]
+
+def shared_policy_model(prefer_export=False):
+    from model_export import load_policy_model
+    return shared("policy_export" if prefer_export else "policy", lambda: load_policy_model(prefer_export=prefer_export))
+
+def build_ismcts():
+    from ismcts_agent import ISMCTSAgent
+    # Le DQN, s'il existe, sert d'a priori à la racine
+    try:
+        prior_model, state_dim = shared_policy_model()
+        encoder = encoder_for_dim(state_dim).name
+    except FileNotFoundError:
+        prior_model, encoder = None, DEFAULT_ENCODER
+    return ISMCTSAgent(time_budget=1.0, prior_model=prior_model, encoder=encoder)
+
 class GameInterface:
-    def __init__(self, root, mode="Humain vs IA"):
+    # root : fenêtre Tk, ou cadre de menu.py ; on_menu : retour au menu dans le même processus
+    def __init__(self, root, mode="Humain vs IA", server=None, startup_report=None, on_menu=None, started=START,
+                 prefer_export=False):
         self.root = root
         self.mode = mode
-        self.root.title(f"Battle Line - {mode}")
-        self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
+        self.prefer_export = prefer_export
+        self.server = server
+        self.startup_report = startup_report
+        self.on_menu = on_menu
+        self.started = started
+        self.timings = {"imports": max(0.0, IMPORTS_DONE - started)}
+        self.root.winfo_toplevel().title(f"Battle Line - {mode}")
+        self.root.winfo_toplevel().geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
 
         self.canvas = tk.Canvas(root, width=WINDOW_WIDTH, height=WINDOW_HEIGHT - 150, bg="green")
         self.canvas.pack(side="top")
@@ -56,17 +128,32 @@ class GameInterface:
         self.card_images = {}
         self.flag_images = {}
         self.load_images()
-        self.init_sounds()
-
-        self.env = BattleLineEnv(opponent_policy="random")
-        self.state = self.env.game.get_state_vector()
-        self.agent = None
-        if mode == "Humain vs IA":
-            self.agent = DQNAgent(STATE_DIM, ACTION_DIM)
-            self.agent.policy_net.load_state_dict(torch.load("model/model.pth", map_location=torch.device('cpu')))
-            self.agent.policy_net.eval()
-
-        self.deck_image = self.load_deck_image("card-troop.png", 80, 120)
+        self.timings["images"] = time.perf_counter() - started
+        self.click_sound = None
+        self.congrats_sound = None
+
+        self.policy = None
+        self.policy_encoder = None
+        self.ismcts = None
+        self.encoder = DEFAULT_ENCODER
+        self.opponent_policy = "random"
+        if server is not None:
+            # Client léger : le serveur de jeu tient la partie et fait jouer l'IA
+            self.env = RemoteBattleLineEnv(server)
+        elif mode == "Humain vs ISMCTS":
+            # L'adversaire ISMCTS joue dans env.step
+            self.opponent_policy = self.ismcts_move
+        if server is None:
+            self.env = BattleLineEnv(opponent_policy=self.opponent_policy, encoder=self.encoder)
+            self.state = self.env.game.get_state_vector()
+
+        # torch, le modèle et les sons se chargent en arrière-plan : le plateau s'affiche tout de suite,
+        # le premier coup de l'IA attend self.ai_ready
+        self.loader = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chargement")
+        self.ai_ready = self.loader.submit(self.load_ai)
+        self.sounds_ready = self.loader.submit(self.init_sounds)
+
+        self.deck_image = self.sprites["deck"]
         self.deck_x = 45
         self.deck_y = (WINDOW_HEIGHT - 150) // 2
         if self.deck_image:
@@ -78,6 +165,7 @@ class GameInterface:
         self.draw_hands()
 
         self.drag_data = {"item": None, "x": 0, "y": 0}
+        self.pending_move = False
 
         self.button_frame = tk.Frame(root)
         self.button_frame.pack(side="bottom", pady=5)
@@ -93,54 +181,69 @@ class GameInterface:
         self.bottom_info_label = tk.Label(self.score_frame, text="Joueur: Drapeaux: 0 | Adjacents: False", font=("Arial", 12))
         self.bottom_info_label.pack(side="left", padx=20)
 
+        self.root.after_idle(self.report_first_frame)
+
+    def load_ai(self):
+        # Fil de chargement
+        if self.server is None and self.mode == "Humain vs IA":
+            # model/model.pth, ou son export (int8, TorchScript) avec --prefer-export (model_export.find_model) ;
+            # l'encodeur d'état se déduit de la taille d'entrée du modèle
+            self.policy, state_dim = shared_policy_model(self.prefer_export)
+            self.policy_encoder = encoder_for_dim(state_dim)
+        elif self.server is None and self.mode == "Humain vs ISMCTS":
+            self.ismcts = shared("ismcts", build_ismcts)
+        self.timings["ai_ready"] = time.perf_counter() - self.started
+
+    def ismcts_move(self, game, player):
+        # Appelé dans env.step : play_human_move a déjà attendu la fin du chargement
+        if not self.ai_ready.done() or self.ai_failed():
+            return random.choice(game.state.available_actions(player))
+        return self.ismcts(game, player)
+
+    def ai_failed(self):
+        # À appeler une fois self.ai_ready terminé. Chargement en échec (modèle absent...) :
+        # message sur le plateau, l'adversaire joue au hasard
+        error = self.ai_ready.exception()
+        if error is not None and not self.canvas.find_withtag("ai_error"):
+            self.canvas.create_text(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 40,
+                                    text=f"IA indisponible ({error}) : coups aléatoires",
+                                    font=("Arial", 14, "bold"), fill="red", tags="ai_error")
+        return error is not None
+
     def init_sounds(self):
-        try:
-            pygame.mixer.init()
-        except Exception as e:
-            print("Erreur d'initialisation du mixer :", e)
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        sounds_dir = os.path.join(script_dir, "music")
-        click_path = os.path.join(sounds_dir, "Click - Sound Effect (HD).mp3")
-        if os.path.exists(click_path):
-            try:
-                self.click_sound = pygame.mixer.Sound(click_path)
-            except Exception as e:
-                print("Erreur lors du chargement du son clic :", e)
-                self.click_sound = None
-        else:
-            print("Fichier click.wav manquant dans le dossier sounds")
-            self.click_sound = None
-        congrats_path = os.path.join(sounds_dir, "congrats.wav")
-        if os.path.exists(congrats_path):
-            try:
-                self.congrats_sound = pygame.mixer.Sound(congrats_path)
-            except Exception as e:
-                print("Erreur lors du chargement du son de félicitations :", e)
-                self.congrats_sound = None
-        else:
-            print("Fichier congrats.wav manquant dans le dossier sounds")
-            self.congrats_sound = None
+        # Fil de chargement : décodage des MP3 (une fois par processus) et lancement de la musique
+        self.click_sound, self.congrats_sound = shared("sounds", load_sounds)
+        init_music()
+        self.timings["sounds_ready"] = time.perf_counter() - self.started
+
+    def report_first_frame(self):
+        self.root.update_idletasks()
+        self.timings["first_frame"] = time.perf_counter() - self.started
+        t = self.timings
+        print(f"Premier affichage : {t['first_frame'] * 1000:.0f} ms "
+              f"(imports {t['imports'] * 1000:.0f} ms, fenêtre et images {(t['images'] - t['imports']) * 1000:.0f} ms)")
+        self.report_startup()
+
+    def report_startup(self):
+        # Rapport complet une fois l'IA et les sons chargés ; --startup-report FICHIER y ajoute une ligne JSON
+        if not (self.ai_ready.done() and self.sounds_ready.done()):
+            self.root.after(100, self.report_startup)
+            return
+        for name, future in (("IA", self.ai_ready), ("sons", self.sounds_ready)):
+            if future.exception() is not None:
+                print(f"Échec du chargement ({name}) : {future.exception()}")
+        t = self.timings
+        print(" | ".join(f"{label} : {t[key] * 1000:.0f} ms" for key, label in
+                         (("ai_ready", "IA prête"), ("sounds_ready", "sons prêts")) if key in t))
+        if self.startup_report:
+            write_json_line(self.startup_report, {"mode": self.mode, "time": time.time(),
+                                                  **{f"{key}_ms": value * 1000 for key, value in t.items()}})
 
     def load_images(self):
-        images_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
-        for color in CARD_COLORS:
-            for value in VALUES:
-                path = os.path.join(images_dir, f"{color}-{value}.png")
-                if os.path.exists(path):
-                    img = Image.open(path).resize((HAND_CARD_WIDTH, HAND_CARD_HEIGHT), Image.Resampling.LANCZOS)
-                    self.card_images[(color, value)] = ImageTk.PhotoImage(img)
-        for color in ["blue", "red", "white"]:
-            path = os.path.join(images_dir, f"flag-{color}.png")
-            if os.path.exists(path):
-                img = Image.open(path).resize((FLAG_WIDTH, FLAG_HEIGHT), Image.Resampling.LANCZOS)
-                self.flag_images[color] = ImageTk.PhotoImage(img)
-
-    def load_deck_image(self, filename, width, height):
-        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images", filename)
-        if os.path.exists(path):
-            img = Image.open(path).resize((width, height), Image.Resampling.LANCZOS)
-            return ImageTk.PhotoImage(img)
-        return None
+        # Atlas pré-redimensionné partagé par les interfaces (asset_cache)
+        self.sprites = photo_images((HAND_CARD_WIDTH, HAND_CARD_HEIGHT), (FLAG_WIDTH, FLAG_HEIGHT))
+        self.card_images.update(self.sprites["cards"])
+        self.flag_images.update(self.sprites["flags"])
 
     def draw_flags(self):
         for flag in self.flags:
@@ -198,18 +301,32 @@ class GameInterface:
             item = self.canvas.create_image(x, y, image=img, anchor="nw")
             self.hand_card_items[item] = {"card": card, "orig_pos": (x, y), "player": "top", "index": idx}
 
+    def show_loading(self):
+        if not self.canvas.find_withtag("loading_message"):
+            self.canvas.create_text(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 40, text="Chargement de l'IA...",
+                                    font=("Arial", 20, "bold"), fill="white", tags="loading_message")
+
     def play_ai_turn(self):
-        if self.env.game.state.current_turn != "opponent":
+        if not self.canvas.winfo_exists():
+            return
+        if self.server is not None or self.env.game.state.current_turn != "opponent":
             return
-        state = self.env.game.get_state_vector()
-        valid_actions = self.env.get_valid_actions()
-        state_tensor = torch.FloatTensor(state).unsqueeze(0)
-        with torch.no_grad():
-            q_values = self.agent.policy_net(state_tensor).squeeze().numpy()
-        masked_q = np.full(ACTION_DIM, -np.inf)
-        for a in valid_actions:
-            masked_q[a] = q_values[a]
-        action = int(np.argmax(masked_q))
+        # Premier coup : attend le chargement du modèle sans bloquer la boucle Tk
+        if not self.ai_ready.done():
+            self.show_loading()
+            self.root.after(50, self.play_ai_turn)
+            return
+        self.canvas.delete("loading_message")
+        action_mask = self.env.game.get_action_mask(copy=False)
+        if self.ai_failed():
+            action = int(random.choice(np.flatnonzero(action_mask)))
+        else:
+            import torch
+            state = self.policy_encoder.encode_batch(self.env.game.slot_cards()[None])[0]
+            state_tensor = torch.FloatTensor(state).unsqueeze(0)
+            with torch.no_grad():
+                q_values = self.policy(state_tensor).squeeze().numpy()
+            action = int(np.argmax(np.where(action_mask, q_values, -np.inf)))
         
         _, reward, done, info = self.env.step(action)
         self.draw_flags()
@@ -240,59 +357,65 @@ class GameInterface:
         if item is None:
             return
         info = self.hand_card_items.get(item)
-        if not info or info["player"] != "bottom":
+        if not info or info["player"] != "bottom" or self.pending_move:
             self.canvas.coords(item, *info["orig_pos"])
             return
         cx, cy = self.canvas.coords(item)[0] + HAND_CARD_WIDTH / 2, self.canvas.coords(item)[1] + HAND_CARD_HEIGHT / 2
         for flag in self.flags:
             x1, y1, x2, y2 = flag["bbox"]
             if x1 <= cx <= x2 and y1 <= cy <= y2:
-                action = info["index"] * NUM_FLAGS + flag["index"]
-                _, _, done, step_info = self.env.step(action)
-                if "error" in step_info:
-                    self.canvas.coords(item, *info["orig_pos"])
-                    self.canvas.create_text(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2,
-                                              text="Mouvement invalide!", font=("Arial", 24, "bold"),
-                                              fill="white", tags="error_message")
-                    self.root.after(2000, lambda: self.canvas.delete("error_message"))
-                else:
-                    self.draw_flags()
-                    self.draw_hands()
-                    self.update_scores()
-                    if not self.check_game_over():
-                        self.root.after(1000, self.play_ai_turn)
+                self.play_human_move(info["index"] * NUM_FLAGS + flag["index"], item, info)
                 break
         self.drag_data["item"] = None
 
+    def play_human_move(self, action, item, info):
+        if not self.canvas.winfo_exists():
+            return
+        # Humain vs ISMCTS : l'adversaire répond dans env.step, on attend donc le chargement
+        # de l'IA sans bloquer la boucle Tk (la carte reste posée en attendant)
+        if self.server is None and self.mode == "Humain vs ISMCTS" and not self.ai_ready.done():
+            self.pending_move = True
+            self.show_loading()
+            self.root.after(50, lambda: self.play_human_move(action, item, info))
+            return
+        self.pending_move = False
+        self.canvas.delete("loading_message")
+        _, _, done, step_info = self.env.step(action)
+        if "error" in step_info:
+            self.canvas.coords(item, *info["orig_pos"])
+            self.canvas.create_text(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2,
+                                      text="Mouvement invalide!", font=("Arial", 24, "bold"),
+                                      fill="white", tags="error_message")
+            self.root.after(2000, lambda: self.canvas.winfo_exists() and self.canvas.delete("error_message"))
+        else:
+            self.draw_flags()
+            self.draw_hands()
+            self.update_scores()
+            if not self.check_game_over():
+                self.root.after(1000, self.play_ai_turn)
+
     def draw_card_bottom(self):
+        if self.server is not None:
+            return
         if self.env.game.state.current_turn == "player":
             if self.env.game.state.deck and len(self.env.game.state.hands["player"]) < MAX_HAND_SIZE:
                 self.env.game.state.hands["player"].append(self.env.game.state.deck.pop())
+                self.env.game.resync()
                 self.draw_hands()
 
     def update_scores(self):
-        flags = self.env.game.state.flags
-        pf = sum(1 for f in flags if f.winner == "player")
-        of = sum(1 for f in flags if f.winner == "opponent")
-        pa = any(flags[i].winner == "player" and flags[i+1].winner == "player" and flags[i+2].winner == "player" 
-                 for i in range(len(flags)-2))
-        oa = any(flags[i].winner == "opponent" and flags[i+1].winner == "opponent" and flags[i+2].winner == "opponent" 
-                 for i in range(len(flags)-2))
+        state = self.env.game.state
+        pf, of = state.flag_counts["player"], state.flag_counts["opponent"]
+        pa, oa = state.has_adjacent("player"), state.has_adjacent("opponent")
         self.top_info_label.config(text=f"Adversaire: Drapeaux: {of} | Adjacents: {oa}")
         self.bottom_info_label.config(text=f"Joueur: Drapeaux: {pf} | Adjacents: {pa}")
 
     def check_game_over(self):
-        flags = self.env.game.state.flags
-        pf = sum(1 for f in flags if f.winner == "player")
-        of = sum(1 for f in flags if f.winner == "opponent")
-        pa = any(flags[i].winner == "player" and flags[i+1].winner == "player" and flags[i+2].winner == "player"
-                 for i in range(len(flags)-2))
-        oa = any(flags[i].winner == "opponent" and flags[i+1].winner == "opponent" and flags[i+2].winner == "opponent"
-                 for i in range(len(flags)-2))
-        if pf >= 5 or pa:
+        winner = self.env.game.state.check_game_over()
+        if winner == "player":
             self.display_game_over("Joueur")
             return True
-        elif of >= 5 or oa:
+        elif winner == "opponent":
             self.display_game_over("Adversaire")
             return True
         return False
@@ -312,8 +435,11 @@ class GameInterface:
 
     def restart_game(self):
         from battle_line_game import GameState
-        self.env = BattleLineEnv(opponent_policy="random")
-        self.state = self.env.game.get_state_vector()
+        if self.server is not None:
+            self.env.reset()
+        else:
+            self.env = BattleLineEnv(opponent_policy=self.opponent_policy, encoder=self.encoder)
+            self.state = self.env.game.get_state_vector()
         self.canvas.delete("all")
         if self.deck_image:
             self.canvas.create_image(self.deck_x, self.deck_y, image=self.deck_image, anchor="center")
@@ -326,7 +452,15 @@ class GameInterface:
         self.restart_btn.config(state="disabled")
 
 
+    def close(self):
+        stop_music()
+        self.loader.shutdown(wait=False)
+
     def return_to_menu(self):
+        if self.on_menu is not None:
+            self.close()
+            self.on_menu()
+            return
         script_path = os.path.join(os.path.dirname(__file__), "menu.py")
         if os.path.exists(script_path):
             subprocess.Popen([sys.executable, script_path])
@@ -335,9 +469,16 @@ class GameInterface:
 
 
 def main():
-    init_music()
+    # python HumainVS_IA.py --server http://127.0.0.1:8765 : client léger de game_server.py
+    # python HumainVS_IA.py --ismcts : adversaire ISMCTS (1 s par coup)
+    # python HumainVS_IA.py --startup-report demarrage.jsonl : temps de démarrage ajoutés à ce fichier
+    # python HumainVS_IA.py --prefer-export : joue avec model_int8.pt / model.pt au lieu de model.pth
+    server = sys.argv[sys.argv.index("--server") + 1] if "--server" in sys.argv[:-1] else None
+    mode = "Humain vs ISMCTS" if "--ismcts" in sys.argv else "Humain vs IA"
+    startup_report = sys.argv[sys.argv.index("--startup-report") + 1] if "--startup-report" in sys.argv[:-1] else None
     root = tk.Tk()
-    GameInterface(root, mode="Humain vs IA")  #
+    GameInterface(root, mode=mode, server=server, startup_report=startup_report,
+                  prefer_export="--prefer-export" in sys.argv)
     root.mainloop()
 
 if __name__ == "__main__":
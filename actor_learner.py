@@ -0,0 +1,268 @@
+import random
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
+
+from battle_line_env import BattleLineEnv
+from battle_line_game import DEFAULT_ENCODER, get_encoder
+from dqn_agent import DQN, DQNAgent
+from n_step import NStepAccumulator
+
+# Champs de statistiques par acteur (tableau partagé sans verrou, un seul écrivain par champ)
+STEPS, EPISODES, WINS, REWARDS, VERSION = range(5)
+STAT_FIELDS = 5
+
+
+class TransitionRing:
+    # File circulaire producteur/consommateur en mémoire partagée : l'acteur écrit puis
+    # avance le compteur d'écriture, l'apprenant lit jusqu'à ce compteur puis avance le sien.
+    def __init__(self, capacity, state_dim, name=None):
+        self.capacity = capacity
+        self.state_dim = state_dim
+        size = 16 + capacity * (8 + 4 + 4 + 1 + 2 * state_dim)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        buf = self.shm.buf
+        self.counters = np.ndarray(2, dtype=np.int64, buffer=buf, offset=0)
+        offset = 16
+        self.actions = np.ndarray(capacity, dtype=np.int64, buffer=buf, offset=offset)
+        offset += 8 * capacity
+        self.rewards = np.ndarray(capacity, dtype=np.float32, buffer=buf, offset=offset)
+        offset += 4 * capacity
+        self.discounts = np.ndarray(capacity, dtype=np.float32, buffer=buf, offset=offset)
+        offset += 4 * capacity
+        self.dones = np.ndarray(capacity, dtype=np.uint8, buffer=buf, offset=offset)
+        offset += capacity
+        self.states = np.ndarray((capacity, state_dim), dtype=np.int8, buffer=buf, offset=offset)
+        offset += capacity * state_dim
+        self.next_states = np.ndarray((capacity, state_dim), dtype=np.int8, buffer=buf, offset=offset)
+        if self.owner:
+            self.counters[:] = 0
+
+    def spec(self):
+        return self.shm.name, self.capacity, self.state_dim
+
+    @classmethod
+    def attach(cls, spec):
+        name, capacity, state_dim = spec
+        return cls(capacity, state_dim, name=name)
+
+    def push(self, state, action, reward, next_state, done, discount, stop):
+        while self.counters[0] - self.counters[1] >= self.capacity:
+            if stop.is_set():
+                return False
+            time.sleep(0.0005)
+        i = self.counters[0] % self.capacity
+        self.states[i] = state
+        self.next_states[i] = next_state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.dones[i] = done
+        self.discounts[i] = discount
+        self.counters[0] += 1
+        return True
+
+    def drain(self):
+        written, read = int(self.counters[0]), int(self.counters[1])
+        idx = np.arange(read, written) % self.capacity
+        batch = (self.states[idx], self.actions[idx], self.rewards[idx], self.next_states[idx], self.dones[idx],
+                 self.discounts[idx])
+        self.counters[1] = written
+        return batch
+
+    def close(self):
+        # Libère les vues NumPy avant de fermer le segment
+        del self.counters, self.actions, self.rewards, self.discounts, self.dones, self.states, self.next_states
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedWeights:
+    def __init__(self, net, ctx):
+        self.vector = parameters_to_vector(net.parameters()).detach().clone().share_memory_()
+        self.version = ctx.Value('q', 0, lock=False)
+        self.lock = ctx.Lock()
+
+    def publish(self, net):
+        with self.lock:
+            self.vector.copy_(parameters_to_vector(net.parameters()).detach())
+            self.version.value += 1
+        return self.version.value
+
+    def pull(self, net, seen_version):
+        if self.version.value == seen_version:
+            return seen_version
+        with self.lock:
+            vector = self.vector.clone()
+            version = self.version.value
+        vector_to_parameters(vector, net.parameters())
+        return version
+
+
+def _actor_main(actor_id, ring_spec, weights, epsilon, stats, stop, seed, encoder, action_dim, n_pas, gamma):
+    torch.set_num_threads(1)
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    ring = TransitionRing.attach(ring_spec)
+    env = BattleLineEnv(opponent_policy="random", encoder=encoder)
+    # L'acteur ne fait que choisir des actions : réseau seul en mode évaluation, sans mémoire ni optimiseur
+    net = DQN(env.state_dim, action_dim).eval()
+    accumulateur = NStepAccumulator(n_pas, gamma)
+    row = actor_id * STAT_FIELDS
+    version = -1
+    while not stop.is_set():
+        version = weights.pull(net, version)
+        stats[row + VERSION] = version
+        eps = epsilon.value
+        accumulateur.reset()
+        etat = env.reset()
+        termine = False
+        recompense_ep = 0.0
+        while not termine and not stop.is_set():
+            masque = env.get_action_mask()
+            if not masque.any():
+                gagnant = env.game.state.check_game_over()
+                recompense_finale = 100.0 if gagnant == "player" else -100.0 if gagnant == "opponent" else 0.0
+                for transition in accumulateur.push(etat, 0, recompense_finale, etat, True):
+                    ring.push(*transition, stop)
+                recompense_ep += recompense_finale
+                break
+            if random.random() < eps:
+                action = int(random.choice(np.flatnonzero(masque)))
+            else:
+                with torch.inference_mode():
+                    q_values = net(torch.as_tensor(etat, dtype=torch.float32).unsqueeze(0))[0]
+                action = int(torch.where(torch.as_tensor(masque), q_values, -torch.inf).argmax())
+            etat_suivant, recompense, termine, info = env.step(action)
+            for transition in accumulateur.push(etat, action, recompense, etat_suivant, termine):
+                ring.push(*transition, stop)
+            stats[row + STEPS] += 1
+            etat = etat_suivant
+            recompense_ep += recompense
+        stats[row + REWARDS] += recompense_ep
+        stats[row + EPISODES] += 1
+        if env.game.state.check_game_over() == "player":
+            stats[row + WINS] += 1
+    ring.close()
+
+
+def entrainer_parallele(episodes=1000, acteurs=4, encoder=DEFAULT_ENCODER, action_dim=63, capacite_file=256,
+                        sync_every=100, report_every=10.0, seed=0, n_pas=1, dossier_modele="./model", journal=None,
+                        **agent_kwargs):
+    # journal : MetricsWriter (une ligne "window" tous les 50 épisodes, une ligne "report" par rapport de l'apprenant)
+    ctx = mp.get_context("spawn")
+    state_dim = get_encoder(encoder).dim
+    agent = DQNAgent(state_dim=state_dim, action_dim=action_dim, **agent_kwargs)
+    rings = [TransitionRing(capacite_file, state_dim) for _ in range(acteurs)]
+    weights = SharedWeights(agent.policy_net, ctx)
+    epsilon = ctx.Value('d', agent.epsilon, lock=False)
+    stats = ctx.Array('d', acteurs * STAT_FIELDS, lock=False)
+    stop = ctx.Event()
+    procs = [ctx.Process(target=_actor_main,
+                         args=(i, rings[i].spec(), weights, epsilon, stats, stop, seed + i, encoder, action_dim,
+                               n_pas, agent.gamma),
+                         daemon=True)
+             for i in range(acteurs)]
+    for p in procs:
+        p.start()
+
+    resultats = {"episodes": [], "recompenses_moyennes": [], "taux_victoire": [], "epsilons": [],
+                 "pas_par_seconde": [], "retard_sync": []}
+    publications = {0: time.time()}
+    mises_a_jour = 0
+    # Une mise à jour par transition reçue, comme la boucle séquentielle après chaque pas d'env
+    a_faire = 0
+    pertes = []
+    dernier_rapport = time.time()
+    pas_precedents = [0.0] * acteurs
+    episodes_palier, victoires_palier, recompenses_palier = 0, 0.0, 0.0
+    try:
+        while True:
+            total_episodes = sum(stats[i * STAT_FIELDS + EPISODES] for i in range(acteurs))
+            if total_episodes >= episodes:
+                # Objectif atteint : les acteurs s'arrêtent, l'apprenant termine les mises à jour dues
+                stop.set()
+            elif not any(p.is_alive() for p in procs):
+                codes = ", ".join(str(p.exitcode) for p in procs)
+                raise RuntimeError(f"Tous les acteurs se sont arrêtés (codes de sortie : {codes})")
+            # Pas de nouvelle lecture tant que des mises à jour restent dues : les files se remplissent
+            # et bloquent les acteurs, ce qui garde le ratio rejeu/collecte de la boucle séquentielle
+            if a_faire == 0:
+                for ring in rings:
+                    for transition in zip(*ring.drain()):
+                        agent.store_transition(*transition)
+                        if len(agent.memory) >= agent.batch_size:
+                            a_faire += 1
+            if a_faire > 0:
+                perte = agent.update()
+                if perte is not None:
+                    pertes.append(perte)
+                a_faire -= 1
+                mises_a_jour += 1
+                epsilon.value = agent.epsilon
+                if mises_a_jour % sync_every == 0:
+                    publications[weights.publish(agent.policy_net)] = time.time()
+            elif stop.is_set():
+                break
+            else:
+                time.sleep(0.001)
+
+            if total_episodes - episodes_palier >= 50:
+                victoires = sum(stats[i * STAT_FIELDS + WINS] for i in range(acteurs))
+                recompenses = sum(stats[i * STAT_FIELDS + REWARDS] for i in range(acteurs))
+                n = total_episodes - episodes_palier
+                resultats["episodes"].append(int(total_episodes))
+                resultats["taux_victoire"].append((victoires - victoires_palier) / n)
+                resultats["recompenses_moyennes"].append((recompenses - recompenses_palier) / n)
+                resultats["epsilons"].append(agent.epsilon)
+                if journal is not None:
+                    journal.log({"type": "window", "episode": int(total_episodes),
+                                 "win_rate": resultats["taux_victoire"][-1],
+                                 "mean_reward": resultats["recompenses_moyennes"][-1], "epsilon": agent.epsilon})
+                episodes_palier, victoires_palier, recompenses_palier = total_episodes, victoires, recompenses
+
+            maintenant = time.time()
+            if maintenant - dernier_rapport >= report_every:
+                duree = maintenant - dernier_rapport
+                version = weights.version.value
+                vitesses, retards = [], []
+                for i in range(acteurs):
+                    pas = stats[i * STAT_FIELDS + STEPS]
+                    vitesse = (pas - pas_precedents[i]) / duree
+                    pas_precedents[i] = pas
+                    vue = int(stats[i * STAT_FIELDS + VERSION])
+                    retard_s = maintenant - publications.get(vue + 1, maintenant) if vue < version else 0.0
+                    vitesses.append(vitesse)
+                    retards.append((version - vue, retard_s))
+                    print(f"Acteur {i} | {vitesse:.0f} pas/s | Retard sync : {version - vue} versions ({retard_s:.2f} s)")
+                print(f"Apprenant | {mises_a_jour} mises à jour | Épisodes : {int(total_episodes)}/{episodes} | Epsilon : {agent.epsilon:.2f}")
+                resultats["pas_par_seconde"].append(vitesses)
+                resultats["retard_sync"].append(retards)
+                if journal is not None:
+                    journal.log({"type": "report", "episode": int(total_episodes), "updates": mises_a_jour,
+                                 "loss": sum(pertes) / len(pertes) if pertes else None, "epsilon": agent.epsilon,
+                                 "steps_per_second": sum(vitesses), "time": maintenant})
+                pertes = []
+                dernier_rapport = maintenant
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        for ring in rings:
+            ring.close()
+    agent.policy_net.save(model_folder_path=dossier_modele)
+    if agent_kwargs.get("replay_path") is not None:
+        agent.memory.flush()
+    return resultats
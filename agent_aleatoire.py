@@ -3,7 +3,7 @@ import random
 import os
 import sys
 import subprocess
-from PIL import Image, ImageTk
+from asset_cache import photo_images
 from battle_line_env import BattleLineEnv
 
 WINDOW_WIDTH = 1400
@@ -14,13 +14,13 @@ HAND_CARD_HEIGHT = 96
 FLAG_WIDTH = 60
 FLAG_HEIGHT = 80
 
-CARD_COLORS = ["blue", "red", "pink", "yellow", "green", "white"]
-VALUES = list(range(1, 11))
 
 class BattleLineAutoInterface:
-    def __init__(self, root):
+    # root : fenêtre Tk, ou cadre de menu.py ; on_menu : retour au menu dans le même processus
+    def __init__(self, root, on_menu=None):
         self.root = root
-        self.root.title("Battle Line - Agent aléatoire vs Agent aléatoire")
+        self.on_menu = on_menu
+        self.root.winfo_toplevel().title("Battle Line - Agent aléatoire vs Agent aléatoire")
 
         self.canvas = tk.Canvas(root, width=WINDOW_WIDTH, height=WINDOW_HEIGHT - 150, bg="green")
         self.canvas.pack()
@@ -50,19 +50,10 @@ class BattleLineAutoInterface:
         self.bottom_player_label.place(x=80, y=WINDOW_HEIGHT - 200)
 
     def load_images(self):
-        images_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
-        for color in CARD_COLORS:
-            for value in VALUES:
-                filename = f"{color}-{value}.png"
-                path = os.path.join(images_dir, filename)
-                if os.path.exists(path):
-                    img = Image.open(path).resize((HAND_CARD_WIDTH, HAND_CARD_HEIGHT), Image.Resampling.LANCZOS)
-                    self.card_images[(color, value)] = ImageTk.PhotoImage(img)
-        for color in ["white", "blue", "red"]:
-            path = os.path.join(images_dir, f"flag-{color}.png")
-            if os.path.exists(path):
-                img = Image.open(path).resize((FLAG_WIDTH, FLAG_HEIGHT), Image.Resampling.LANCZOS)
-                self.flag_images[color] = ImageTk.PhotoImage(img)
+        # Atlas pré-redimensionné partagé par les interfaces (asset_cache)
+        self.sprites = photo_images((HAND_CARD_WIDTH, HAND_CARD_HEIGHT), (FLAG_WIDTH, FLAG_HEIGHT))
+        self.card_images.update(self.sprites["cards"])
+        self.flag_images.update(self.sprites["flags"])
 
     def draw_flags(self):
         spacing = WINDOW_WIDTH / (NUM_FLAGS + 1)
@@ -103,6 +94,8 @@ class BattleLineAutoInterface:
             self.canvas.itemconfigure(self.flags[i]["item"], image=self.flag_images[color])
 
     def play_turns(self):
+        if not self.canvas.winfo_exists():
+            return
         if self.env.get_valid_actions():
             action = random.choice(self.env.get_valid_actions())
             _, _, done, _ = self.env.step(action)
@@ -122,6 +115,9 @@ class BattleLineAutoInterface:
             self.root.after(1000, self.play_turns)
 
     def return_to_menu(self):
+        if self.on_menu is not None:
+            self.on_menu()
+            return
         script_path = os.path.join(os.path.dirname(__file__), "menu.py")
         if os.path.exists(script_path):
             subprocess.Popen([sys.executable, script_path])
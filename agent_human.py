@@ -1,8 +1,8 @@
 import subprocess
 import sys
 import tkinter as tk
-from PIL import Image, ImageTk
 import os
+from asset_cache import photo_images
 from battle_line_game import BattleLineGame, Card
 
 WINDOW_WIDTH = 1400
@@ -19,14 +19,13 @@ TOP_HAND_Y = 20
 BOTTOM_HAND_Y = WINDOW_HEIGHT - CARD_HEIGHT - 150
 HAND_START_X = 50
 
-BASE_DIR = os.path.dirname(__file__)
-CARD_COLORS = ["blue", "red", "pink", "yellow", "green", "white"]
-VALUES = list(range(1, 11))
 
 class HumanVsHuman:
-    def __init__(self, root):
+    # root : fenêtre Tk, ou cadre de menu.py ; on_menu : retour au menu dans le même processus
+    def __init__(self, root, on_menu=None):
         self.root = root
-        self.root.title("Battle Line - Humain vs Humain")
+        self.on_menu = on_menu
+        self.root.winfo_toplevel().title("Battle Line - Humain vs Humain")
         self.canvas = tk.Canvas(root, width=WINDOW_WIDTH, height=WINDOW_HEIGHT - 150, bg="green")
         self.canvas.pack(side="top")
 
@@ -38,7 +37,7 @@ class HumanVsHuman:
         self.hand_card_items = {}
         self.placed_cards_visuals = {i: {"player": [], "opponent": []} for i in range(NUM_FLAGS)}
 
-        self.deck_img = self.load_image("card-troop.png", 80, 120)
+        self.deck_img = self.sprites["deck"]
         self.deck_x = 45
         self.deck_y = (WINDOW_HEIGHT - 150) // 2
         self.canvas.create_image(self.deck_x, self.deck_y, image=self.deck_img, anchor="center")
@@ -56,24 +55,11 @@ class HumanVsHuman:
         self.bottom_info = tk.Label(self.score_frame, text="Joueur Bas: Drapeaux: 0", font=("Arial", 12))
         self.bottom_info.pack(side="right", padx=50)
 
-    def load_image(self, filename, w, h):
-        path = os.path.join(BASE_DIR, "images", filename)
-        if os.path.exists(path):
-            return ImageTk.PhotoImage(Image.open(path).resize((w, h)))
-        return None
-
     def load_images(self):
-        for color in CARD_COLORS:
-            for value in VALUES:
-                path = os.path.join(BASE_DIR, "images", f"{color}-{value}.png")
-                if os.path.exists(path):
-                    img = Image.open(path).resize((CARD_WIDTH, CARD_HEIGHT))
-                    self.card_images[(color, value)] = ImageTk.PhotoImage(img)
-        for color in ["white", "blue", "red"]:
-            path = os.path.join(BASE_DIR, "images", f"flag-{color}.png")
-            if os.path.exists(path):
-                img = Image.open(path).resize((FLAG_WIDTH, FLAG_HEIGHT))
-                self.flag_images[color] = ImageTk.PhotoImage(img)
+        # Atlas pré-redimensionné partagé par les interfaces (asset_cache)
+        self.sprites = photo_images((CARD_WIDTH, CARD_HEIGHT), (FLAG_WIDTH, FLAG_HEIGHT))
+        self.card_images.update(self.sprites["cards"])
+        self.flag_images.update(self.sprites["flags"])
 
     def draw_flags(self):
         spacing = WINDOW_WIDTH / (NUM_FLAGS + 1)
@@ -181,8 +167,8 @@ class HumanVsHuman:
                 self.canvas.itemconfigure(self.flag_items[i][0], image=self.flag_images["red"])
 
     def update_scores(self):
-        top_flags = sum(1 for f in self.game.state.flags if f.winner == "player")
-        bot_flags = sum(1 for f in self.game.state.flags if f.winner == "opponent")
+        top_flags = self.game.state.flag_counts["player"]
+        bot_flags = self.game.state.flag_counts["opponent"]
         self.top_info.config(text=f"Joueur Haut: Drapeaux: {top_flags}")
         self.bottom_info.config(text=f"Joueur Bas: Drapeaux: {bot_flags}")
 
@@ -200,6 +186,9 @@ class HumanVsHuman:
         return_button.pack(pady=10)
 
     def return_to_menu(self):
+        if self.on_menu is not None:
+            self.on_menu()
+            return
         script_path = os.path.join(os.path.dirname(__file__), "menu.py")
         if os.path.exists(script_path):
             subprocess.Popen([sys.executable, script_path])
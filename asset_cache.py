@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+
+from PIL import Image, ImageTk
+from PIL.PngImagePlugin import PngInfo
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGES_DIR = os.path.join(BASE_DIR, "images")
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+ATLAS_VERSION = 1
+ATLAS_WIDTH = 1024
+
+CARD_COLORS = ["blue", "red", "pink", "yellow", "green", "white"]
+VALUES = list(range(1, 11))
+FLAG_COLORS = ["white", "blue", "red"]
+CARD_SIZE = (72, 96)
+FLAG_SIZE = (60, 80)
+DECK_SIZE = (80, 120)
+
+# PhotoImage déjà construits dans ce processus, par jeu de tailles
+_photos = {}
+
+
+def sprite_sources(card_size=CARD_SIZE, flag_size=FLAG_SIZE, deck_size=DECK_SIZE):
+    sources = [(f"{color}-{value}", card_size) for color in CARD_COLORS for value in VALUES]
+    sources += [(f"flag-{color}", flag_size) for color in FLAG_COLORS]
+    sources.append(("card-troop", deck_size))
+    return [(name, size) for name, size in sources if os.path.exists(os.path.join(IMAGES_DIR, f"{name}.png"))]
+
+
+def atlas_key(sources):
+    # Toute modification d'une image source (date ou taille du fichier) invalide l'atlas
+    entries = []
+    for name, size in sources:
+        stat = os.stat(os.path.join(IMAGES_DIR, f"{name}.png"))
+        entries.append([name, list(size), stat.st_mtime_ns, stat.st_size])
+    return hashlib.sha1(json.dumps([ATLAS_VERSION, entries]).encode()).hexdigest()
+
+
+def build_atlas(sources):
+    # Rangement en étagères : les images redimensionnées sont posées de gauche à droite
+    boxes = {}
+    x = y = row_height = 0
+    for name, (w, h) in sources:
+        if x + w > ATLAS_WIDTH:
+            x, y, row_height = 0, y + row_height, 0
+        boxes[name] = (x, y, x + w, y + h)
+        x += w
+        row_height = max(row_height, h)
+    atlas = Image.new("RGBA", (ATLAS_WIDTH, y + row_height))
+    for name, size in sources:
+        with Image.open(os.path.join(IMAGES_DIR, f"{name}.png")) as img:
+            atlas.paste(img.resize(size, Image.Resampling.LANCZOS).convert("RGBA"), boxes[name][:2])
+    return atlas, boxes
+
+
+def load_atlas(card_size=CARD_SIZE, flag_size=FLAG_SIZE, deck_size=DECK_SIZE):
+    # Un seul PNG par jeu de tailles dans cache/ ; clé et positions des images dans ses métadonnées texte
+    sources = sprite_sources(card_size, flag_size, deck_size)
+    key = atlas_key(sources)
+    sizes = "_".join(f"{w}x{h}" for w, h in (card_size, flag_size, deck_size))
+    path = os.path.join(CACHE_DIR, f"sprites_{sizes}.png")
+    if os.path.exists(path):
+        atlas = Image.open(path)
+        if atlas.info.get("key") == key:
+            atlas.load()
+            return atlas, {name: tuple(box) for name, box in json.loads(atlas.info["boxes"]).items()}
+        atlas.close()
+    atlas, boxes = build_atlas(sources)
+    info = PngInfo()
+    info.add_text("key", key)
+    info.add_text("boxes", json.dumps(boxes))
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = path + ".tmp"
+        atlas.save(tmp, format="PNG", pnginfo=info)
+        os.replace(tmp, path)
+    except OSError as e:
+        print("Impossible d'écrire le cache des images :", e)
+    return atlas, boxes
+
+
+def photo_images(card_size=CARD_SIZE, flag_size=FLAG_SIZE, deck_size=DECK_SIZE):
+    # Images Tk des interfaces (à appeler une fois la fenêtre Tk créée) :
+    # {"cards": {(couleur, valeur): PhotoImage}, "flags": {couleur: PhotoImage}, "deck": PhotoImage ou None}
+    sizes = (card_size, flag_size, deck_size)
+    if sizes not in _photos:
+        atlas, boxes = load_atlas(*sizes)
+        photos = {name: ImageTk.PhotoImage(atlas.crop(box)) for name, box in boxes.items()}
+        _photos[sizes] = {
+            "cards": {(color, value): photos[f"{color}-{value}"] for color in CARD_COLORS for value in VALUES
+                      if f"{color}-{value}" in photos},
+            "flags": {color: photos[f"flag-{color}"] for color in FLAG_COLORS if f"flag-{color}" in photos},
+            "deck": photos.get("card-troop"),
+        }
+    return _photos[sizes]
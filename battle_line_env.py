@@ -1,38 +1,53 @@
 import random
 import numpy as np
-from battle_line_game import BattleLineGame
+from battle_line_game import DEFAULT_ENCODER, BattleLineGame
+from profiler import NULL_PROFILER
 
 class BattleLineEnv:
-    def __init__(self, opponent_policy="random"):
-        self.game = BattleLineGame()
+    def __init__(self, opponent_policy="random", engine="classic", prove_flags=False, encoder=DEFAULT_ENCODER):
+        self.engine = engine
+        self.prove_flags = prove_flags
+        self.encoder = encoder
+        self.game = BattleLineGame(engine, prove_flags, encoder)
+        self.state_dim = self.game.encoder.dim
         self.opponent_policy = opponent_policy
-        self.prev_flag_winners = [None] * 9
+        self.captures_seen = 0
+        # PhaseProfiler facultatif (main.entrainer_agent) : temps de l'adversaire et de l'observation
+        self.profiler = NULL_PROFILER
 
     def reset(self):
-        self.game = BattleLineGame()
-        self.prev_flag_winners = [None] * 9
+        self.game = BattleLineGame(self.engine, self.prove_flags, self.encoder)
+        self.captures_seen = 0
         return self.game.get_state_vector()
 
     def get_valid_actions(self):
         return self.game.get_valid_actions()
 
+    def get_action_mask(self):
+        return self.game.get_action_mask()
+
+    def _observe(self, reward, done, info):
+        with self.profiler.phase("step.observe"):
+            info["action_mask"] = self.game.get_action_mask()
+            return self.game.get_state_vector(), reward, done, info
+
     def step(self, action):
-        valid_actions = self.get_valid_actions()
-        
-        if not valid_actions:
+        action_mask = self.game.get_action_mask(copy=False)
+
+        if not action_mask.any():
             winner = self.game.state.check_game_over()
             final_reward = 50.0 if winner == "player" else -50.0 if winner == "opponent" else 0.0
             final_reward = max(min(final_reward, 1), -1)
-            return self.game.get_state_vector(), final_reward, True, {"error": "No valid actions"}
+            return self._observe(final_reward, True, {"error": "No valid actions"})
 
-        if action not in valid_actions:
-            return self.game.get_state_vector(), -0.1, True, {"error": "Invalid action selected"}
+        if not (0 <= action < len(action_mask) and action_mask[action]):
+            return self._observe(-0.1, True, {"error": "Invalid action selected"})
 
         card_index, flag_index = self.game.decode_action(action)
         valid, winner, error = self.game.step("player", card_index, flag_index)
-        
+
         if not valid:
-            return self.game.get_state_vector(), -0.1, True, {"error": error}
+            return self._observe(-0.1, True, {"error": error})
 
         reward = 0.01
         reward += self.check_new_flag_captures()
@@ -40,13 +55,18 @@ class BattleLineEnv:
         if winner is not None:
             final_reward = 50.0 if winner == "player" else -50.0 if winner == "opponent" else 0.0
             final_reward = max(min(final_reward, 1), -1)
-            return self.game.get_state_vector(), reward + final_reward, True, {}
+            return self._observe(reward + final_reward, True, {})
 
-        opp_actions = self.game.state.available_actions("opponent")
-        if opp_actions:
-            opp_choice = random.choice(opp_actions)
-            c_idx, f_idx = opp_choice
-            self.game.step("opponent", c_idx, f_idx)
+        with self.profiler.phase("step.opponent"):
+            opp_actions = self.game.state.available_actions("opponent")
+            if opp_actions:
+                # opponent_policy : "random" ou un appelable (jeu, camp) -> (index_carte, index_drapeau), ex. ISMCTSAgent
+                if callable(self.opponent_policy):
+                    c_idx, f_idx = self.opponent_policy(self.game, "opponent")
+                else:
+                    opp_choice = random.choice(opp_actions)
+                    c_idx, f_idx = opp_choice
+                self.game.step("opponent", c_idx, f_idx)
 
         reward += self.check_new_flag_captures()
 
@@ -54,21 +74,21 @@ class BattleLineEnv:
         if winner is not None:
             final_reward = 50.0 if winner == "player" else -50.0 if winner == "opponent" else 0.0
             final_reward = max(min(final_reward, 1), -1)
-            return self.game.get_state_vector(), reward + final_reward, True, {}
+            return self._observe(reward + final_reward, True, {})
 
         reward = max(min(reward, 1), -1)
 
-        return self.game.get_state_vector(), reward, False, {}
+        return self._observe(reward, False, {})
 
     def check_new_flag_captures(self):
         flag_capture_reward = 0.0
-        for i, f in enumerate(self.game.state.flags):
-            if f.winner != self.prev_flag_winners[i]:
-                if f.winner == "player":
-                    flag_capture_reward += 0.2
-                elif f.winner == "opponent":
-                    flag_capture_reward -= 0.2
-                self.prev_flag_winners[i] = f.winner
+        resolved = self.game.state.resolved_flags
+        for _, winner in resolved[self.captures_seen:]:
+            if winner == "player":
+                flag_capture_reward += 0.2
+            elif winner == "opponent":
+                flag_capture_reward -= 0.2
+        self.captures_seen = len(resolved)
         return flag_capture_reward
 
     def render(self):
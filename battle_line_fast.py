@@ -0,0 +1,272 @@
+import random
+from array import array
+
+from battle_line_game import CARDS, FORMATION_RANK_LIST, NUM_CARDS, MAX_HAND_SIZE, Flag, card_id
+
+NUM_FLAGS = 9
+SLOTS_PER_SIDE = 3
+
+PLAYER = 0
+OPPONENT = 1
+DRAW = 2
+NO_WINNER = -1
+EMPTY = -1
+
+SIDES = ("player", "opponent")
+SIDE_INDEX = {"player": PLAYER, "opponent": OPPONENT}
+WINNER_NAMES = {NO_WINNER: None, PLAYER: "player", OPPONENT: "opponent", DRAW: "draw"}
+WINNER_CODES = {name: code for code, name in WINNER_NAMES.items()}
+
+# Disposition du tampon unique (entiers signés sur 8 bits) :
+# pioche | mains | tailles des mains | emplacements des drapeaux | compteurs | gagnants | taille pioche | tour
+# | drapeaux gagnés par camp | premier alignement par camp | vainqueur | ordre de résolution | nb résolus
+DECK = 0
+HAND = DECK + NUM_CARDS
+HAND_SIZE = HAND + 2 * MAX_HAND_SIZE
+SLOT = HAND_SIZE + 2
+COUNT = SLOT + NUM_FLAGS * 2 * SLOTS_PER_SIDE
+WINNER = COUNT + NUM_FLAGS * 2
+DECK_SIZE = WINNER + NUM_FLAGS
+TURN = DECK_SIZE + 1
+FLAG_TOTAL = TURN + 1
+TRIPLE = FLAG_TOTAL + 2
+RESULT = TRIPLE + 2
+RESOLVED = RESULT + 1
+RESOLVED_COUNT = RESOLVED + NUM_FLAGS
+BUFFER_SIZE = RESOLVED_COUNT + 1
+
+
+class FastGameState:
+    def __init__(self, buf=None):
+        if buf is None:
+            deck = list(range(NUM_CARDS))
+            random.shuffle(deck)
+            buf = array('b', [EMPTY]) * BUFFER_SIZE
+            for i in range(MAX_HAND_SIZE):
+                buf[HAND + i] = deck.pop()
+                buf[HAND + MAX_HAND_SIZE + i] = deck.pop()
+            buf[DECK:DECK + len(deck)] = array('b', deck)
+            buf[HAND_SIZE] = MAX_HAND_SIZE
+            buf[HAND_SIZE + 1] = MAX_HAND_SIZE
+            for i in range(COUNT, COUNT + NUM_FLAGS * 2):
+                buf[i] = 0
+            buf[DECK_SIZE] = len(deck)
+            buf[TURN] = PLAYER
+            buf[FLAG_TOTAL] = buf[FLAG_TOTAL + 1] = 0
+            buf[RESOLVED_COUNT] = 0
+        self.buf = buf
+        self._history = []
+
+    @classmethod
+    def from_state(cls, state):
+        buf = array('b', [EMPTY]) * BUFFER_SIZE
+        deck = [card_id(c) for c in state.deck]
+        buf[DECK:DECK + len(deck)] = array('b', deck)
+        buf[DECK_SIZE] = len(deck)
+        for side, name in enumerate(SIDES):
+            hand = [card_id(c) for c in state.hands[name]]
+            buf[HAND + side * MAX_HAND_SIZE:HAND + side * MAX_HAND_SIZE + len(hand)] = array('b', hand)
+            buf[HAND_SIZE + side] = len(hand)
+        for fi, flag in enumerate(state.flags):
+            for side, name in enumerate(SIDES):
+                cards = [card_id(c) for c in flag.slots[name]]
+                base = SLOT + (fi * 2 + side) * SLOTS_PER_SIDE
+                buf[base:base + len(cards)] = array('b', cards)
+                buf[COUNT + fi * 2 + side] = len(cards)
+        buf[TURN] = SIDE_INDEX[state.current_turn]
+        buf[FLAG_TOTAL] = buf[FLAG_TOTAL + 1] = 0
+        buf[RESOLVED_COUNT] = 0
+        fast = cls(buf)
+        for fi, _ in state.resolved_flags:
+            buf[WINNER + fi] = WINNER_CODES[state.flags[fi].winner]
+            fast._record_flag(fi)
+        return fast
+
+    def clone(self):
+        return FastGameState(self.buf[:])
+
+    def apply(self, move):
+        side, card_index, flag_index = move
+        buf = self.buf
+        size = buf[HAND_SIZE + side]
+        if not (0 <= card_index < size and 0 <= flag_index < NUM_FLAGS):
+            return False
+        if buf[WINNER + flag_index] != NO_WINNER:
+            return False
+        count_pos = COUNT + flag_index * 2 + side
+        count = buf[count_pos]
+        if count >= SLOTS_PER_SIDE:
+            return False
+        h = HAND + side * MAX_HAND_SIZE
+        buf[SLOT + (flag_index * 2 + side) * SLOTS_PER_SIDE + count] = buf[h + card_index]
+        buf[count_pos] = count + 1
+        resolved = None
+        if count + 1 == SLOTS_PER_SIDE and buf[COUNT + flag_index * 2 + 1 - side] == SLOTS_PER_SIDE:
+            resolved = (buf[TRIPLE], buf[TRIPLE + 1], buf[RESULT])
+            buf[WINNER + flag_index] = self.flag_result(flag_index)
+            self._record_flag(flag_index)
+        buf[h + card_index:h + size - 1] = buf[h + card_index + 1:h + size]
+        size -= 1
+        deck_size = buf[DECK_SIZE]
+        drew = deck_size > 0
+        if drew:
+            deck_size -= 1
+            buf[h + size] = buf[DECK + deck_size]
+            buf[DECK_SIZE] = deck_size
+            size += 1
+        else:
+            buf[h + size] = EMPTY
+        buf[HAND_SIZE + side] = size
+        self._history.append((drew, resolved, buf[TURN]))
+        buf[TURN] = 1 - side
+        return True
+
+    def undo(self, move):
+        side, card_index, flag_index = move
+        drew, resolved, turn = self._history.pop()
+        buf = self.buf
+        h = HAND + side * MAX_HAND_SIZE
+        size = buf[HAND_SIZE + side]
+        if drew:
+            size -= 1
+            buf[DECK + buf[DECK_SIZE]] = buf[h + size]
+            buf[DECK_SIZE] += 1
+        count_pos = COUNT + flag_index * 2 + side
+        count = buf[count_pos] - 1
+        slot = SLOT + (flag_index * 2 + side) * SLOTS_PER_SIDE + count
+        buf[h + card_index + 1:h + size + 1] = buf[h + card_index:h + size]
+        buf[h + card_index] = buf[slot]
+        buf[slot] = EMPTY
+        buf[count_pos] = count
+        buf[HAND_SIZE + side] = size + 1
+        if resolved is not None:
+            winner = buf[WINNER + flag_index]
+            if winner != DRAW:
+                buf[FLAG_TOTAL + winner] -= 1
+            buf[RESOLVED_COUNT] -= 1
+            buf[RESOLVED + buf[RESOLVED_COUNT]] = EMPTY
+            buf[TRIPLE], buf[TRIPLE + 1], buf[RESULT] = resolved
+            buf[WINNER + flag_index] = NO_WINNER
+        buf[TURN] = turn
+
+    def flag_result(self, flag_index):
+        base = SLOT + flag_index * 2 * SLOTS_PER_SIDE
+        buf = self.buf
+        p_strength = FORMATION_RANK_LIST[(buf[base] * NUM_CARDS + buf[base + 1]) * NUM_CARDS + buf[base + 2]]
+        o_strength = FORMATION_RANK_LIST[(buf[base + 3] * NUM_CARDS + buf[base + 4]) * NUM_CARDS + buf[base + 5]]
+        if p_strength > o_strength:
+            return PLAYER
+        elif o_strength > p_strength:
+            return OPPONENT
+        return DRAW
+
+    def _record_flag(self, flag_index):
+        buf = self.buf
+        winner = buf[WINNER + flag_index]
+        buf[RESOLVED + buf[RESOLVED_COUNT]] = flag_index
+        buf[RESOLVED_COUNT] += 1
+        if winner == DRAW:
+            return
+        buf[FLAG_TOTAL + winner] += 1
+        for start in range(max(0, flag_index - 2), min(flag_index, NUM_FLAGS - 3) + 1):
+            if buf[WINNER + start] == winner and buf[WINNER + start + 1] == winner and buf[WINNER + start + 2] == winner:
+                if buf[TRIPLE + winner] == EMPTY or start < buf[TRIPLE + winner]:
+                    buf[TRIPLE + winner] = start
+                break
+        if buf[FLAG_TOTAL] >= 5:
+            buf[RESULT] = PLAYER
+        elif buf[FLAG_TOTAL + 1] >= 5:
+            buf[RESULT] = OPPONENT
+        else:
+            p, o = buf[TRIPLE], buf[TRIPLE + 1]
+            if p != EMPTY and (o == EMPTY or p < o):
+                buf[RESULT] = PLAYER
+            elif o != EMPTY:
+                buf[RESULT] = OPPONENT
+
+    def game_result(self):
+        return self.buf[RESULT]
+
+    def legal_moves(self, side):
+        buf = self.buf
+        open_flags = [fi for fi in range(NUM_FLAGS)
+                      if buf[WINNER + fi] == NO_WINNER and buf[COUNT + fi * 2 + side] < SLOTS_PER_SIDE]
+        return [(side, i, fi) for i in range(buf[HAND_SIZE + side]) for fi in open_flags]
+
+    def hand_card_ids(self, side):
+        h = HAND + side * MAX_HAND_SIZE
+        return self.buf[h:h + self.buf[HAND_SIZE + side]].tolist()
+
+    def flag_card_ids(self, flag_index, side):
+        base = SLOT + (flag_index * 2 + side) * SLOTS_PER_SIDE
+        return self.buf[base:base + self.buf[COUNT + flag_index * 2 + side]].tolist()
+
+    # Interface compatible avec GameState
+    @property
+    def flag_counts(self):
+        return {name: self.buf[FLAG_TOTAL + side] for side, name in enumerate(SIDES)}
+
+    @property
+    def resolved_flags(self):
+        buf = self.buf
+        return [(fi, WINNER_NAMES[buf[WINNER + fi]]) for fi in buf[RESOLVED:RESOLVED + buf[RESOLVED_COUNT]]]
+
+    def unseen_card_ids(self):
+        buf = self.buf
+        return frozenset(buf[DECK:DECK + buf[DECK_SIZE]].tolist() + self.hand_card_ids(PLAYER) + self.hand_card_ids(OPPONENT))
+
+    def provable_flags(self):
+        from flag_prover import prove_flag
+        unseen = self.unseen_card_ids()
+        return [None if self.buf[WINNER + fi] != NO_WINNER else
+                prove_flag(self.flag_card_ids(fi, PLAYER), self.flag_card_ids(fi, OPPONENT), unseen)
+                for fi in range(NUM_FLAGS)]
+
+    def has_adjacent(self, player):
+        return self.buf[TRIPLE + SIDE_INDEX[player]] != EMPTY
+
+    def check_game_over(self):
+        return WINNER_NAMES[self.game_result()]
+
+    def available_actions(self, player):
+        return [(i, fi) for _, i, fi in self.legal_moves(SIDE_INDEX[player])]
+
+    def play_move(self, player, card_index, flag_index):
+        side = SIDE_INDEX[player]
+        if not (0 <= card_index < self.buf[HAND_SIZE + side] and 0 <= flag_index < NUM_FLAGS):
+            return False, "Index invalide."
+        if self.buf[WINNER + flag_index] != NO_WINNER:
+            return False, "Drapeau déjà décidé."
+        if self.buf[COUNT + flag_index * 2 + side] >= SLOTS_PER_SIDE:
+            return False, "Ce côté a déjà 3 cartes."
+        if not self.apply((side, card_index, flag_index)):
+            return False, "Index invalide."
+        self._history.clear()
+        return True, ""
+
+    @property
+    def current_turn(self):
+        return SIDES[self.buf[TURN]]
+
+    @current_turn.setter
+    def current_turn(self, player):
+        self.buf[TURN] = SIDE_INDEX[player]
+
+    @property
+    def deck(self):
+        return [CARDS[i] for i in self.buf[DECK:DECK + self.buf[DECK_SIZE]]]
+
+    @property
+    def hands(self):
+        return {name: [CARDS[i] for i in self.hand_card_ids(side)] for side, name in enumerate(SIDES)}
+
+    @property
+    def flags(self):
+        flags = []
+        for fi in range(NUM_FLAGS):
+            flag = Flag()
+            for side, name in enumerate(SIDES):
+                flag.slots[name] = [CARDS[i] for i in self.flag_card_ids(fi, side)]
+            flag.winner = WINNER_NAMES[self.buf[WINNER + fi]]
+            flags.append(flag)
+        return flags
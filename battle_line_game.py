@@ -1,10 +1,14 @@
+import itertools
+import os
 import random
 import numpy as np
 
 COLORS = ['red', 'blue', 'green', 'pink', 'yellow', 'white']
 NUM_VALUES = 10
+PLAYERS = ("player", "opponent")
 MAX_HAND_SIZE = 7
 NBR_BITS = 27
+FORMATION_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "formation_ranks_v1.npy")
 
 def encode_card_full16(card, deposited=False, owner=None, flag=None):
     vec = np.zeros(16, dtype=np.int32)
@@ -49,10 +53,17 @@ class Card:
     def __init__(self, color, value):
         self.color = color
         self.value = value
+        self.id = COLORS.index(color) * NUM_VALUES + value - 1
 
     def __repr__(self):
         return f"{self.color[0].upper()}{self.value}"
 
+NUM_CARDS = len(COLORS) * NUM_VALUES
+CARDS = tuple(Card(color, val) for color in COLORS for val in range(1, NUM_VALUES+1))
+
+def card_id(card):
+    return card.id
+
 class Flag:
     def __init__(self):
         self.slots = {"player": [], "opponent": []}
@@ -74,8 +85,8 @@ class Flag:
     def get_winner(self):
         if not self.is_complete():
             return None
-        p_strength = evaluate_hand(self.slots["player"])
-        o_strength = evaluate_hand(self.slots["opponent"])
+        p_strength = formation_rank(self.slots["player"])
+        o_strength = formation_rank(self.slots["opponent"])
         if p_strength > o_strength:
             return "player"
         elif o_strength > p_strength:
@@ -113,8 +124,143 @@ def evaluate_hand(cards):
     desc = sorted(values, reverse=True)
     return (1, desc[0], desc[1], desc[2])
 
+def build_formation_ranks():
+    # Rang dense (1 = plus faible) de chacune des C(60,3) formations, recopié
+    # pour les 6 permutations afin qu'une formation se résolve en une lecture.
+    triples = np.array(list(itertools.combinations(range(NUM_CARDS), 3)), dtype=np.int64)
+    strengths = [evaluate_hand([CARDS[a], CARDS[b], CARDS[c]]) for a, b, c in triples]
+    rank_of = {s: i + 1 for i, s in enumerate(sorted(set(strengths)))}
+    ranks = np.array([rank_of[s] for s in strengths], dtype=np.int16)
+    table = np.zeros((NUM_CARDS, NUM_CARDS, NUM_CARDS), dtype=np.int16)
+    for perm in itertools.permutations(range(3)):
+        table[triples[:, perm[0]], triples[:, perm[1]], triples[:, perm[2]]] = ranks
+    return table
+
+def load_formation_ranks(path=FORMATION_CACHE):
+    # Cache illisible (fichier tronqué, corrompu) ou d'un autre format : la table est reconstruite
+    if os.path.exists(path):
+        try:
+            table = np.load(path)
+        except (OSError, ValueError, EOFError) as e:
+            print("Cache des formations illisible, reconstruction :", e)
+        else:
+            if table.shape == (NUM_CARDS, NUM_CARDS, NUM_CARDS) and table.dtype == np.int16:
+                return table
+    table = build_formation_ranks()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Écriture atomique : un arrêt en cours d'écriture ne laisse pas de cache tronqué
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, table)
+        os.replace(tmp, path)
+    except OSError as e:
+        print("Impossible d'écrire le cache des formations :", e)
+    return table
+
+def formation_rank(cards):
+    if len(cards) < 3:
+        return 0
+    return FORMATION_RANK_LIST[(cards[0].id * NUM_CARDS + cards[1].id) * NUM_CARDS + cards[2].id]
+
+FORMATION_RANKS = load_formation_ranks()
+# Copie à plat pour les lectures scalaires, plus rapides sur une liste que sur le tableau NumPy
+FORMATION_RANK_LIST = FORMATION_RANKS.ravel().tolist()
+
+# Emplacements du vecteur d'état : 7 cartes par main, puis 3 cartes par côté et par drapeau
+NUM_SLOTS = 2 * MAX_HAND_SIZE + 9 * 2 * 3
+FLAG_SLOT_START = 2 * MAX_HAND_SIZE
+
+def build_slot_codes(encode=encode_card_full, bits=NBR_BITS):
+    # codes[emplacement, carte] = encodage de la carte ; la ligne NUM_CARDS (indice -1) est l'emplacement vide
+    codes = np.zeros((NUM_SLOTS, NUM_CARDS + 1, bits), dtype=np.int32)
+    for c, card in enumerate(CARDS):
+        codes[:FLAG_SLOT_START, c] = encode(card, deposited=False, owner=None, flag=None)
+        for flag_idx in range(9):
+            for side, owner in enumerate(("player", "opponent")):
+                base = FLAG_SLOT_START + (flag_idx * 2 + side) * 3
+                codes[base:base + 3, c] = encode(card, deposited=True, owner=owner, flag=flag_idx)
+    return codes
+
+SLOT_CODES = build_slot_codes()
+
+LOCATION_BITS = 10
+
+def build_location_codes():
+    # Code de position d'une carte : rang dans la main du joueur + 1 (3 bits), main adverse (1 bit),
+    # posée côté joueur / côté adversaire (2 bits), numéro du drapeau (4 bits). Pioche : tout à zéro.
+    codes = np.zeros((NUM_SLOTS, LOCATION_BITS), dtype=np.int32)
+    for i in range(MAX_HAND_SIZE):
+        codes[i, 0:3] = [int(x) for x in format(i + 1, '03b')]
+        codes[MAX_HAND_SIZE + i, 3] = 1
+    for flag_idx in range(9):
+        for side in range(2):
+            base = FLAG_SLOT_START + (flag_idx * 2 + side) * 3
+            codes[base:base + 3, 4 + side] = 1
+            codes[base:base + 3, 6:10] = [int(x) for x in format(flag_idx, '04b')]
+    return codes
+
+class SlotEncoder:
+    # Un bloc de `bits` valeurs par emplacement (mains puis drapeaux), qui dépend de la carte posée
+    def __init__(self, name, codes):
+        self.name = name
+        self.codes = codes
+        self.shape = (NUM_SLOTS, codes.shape[2])
+        self.dim = NUM_SLOTS * codes.shape[2]
+
+    def write(self, view, slot, card):
+        view[slot] = self.codes[slot, card]
+
+    def write_all(self, view, slot_cards):
+        view[:] = self.codes[np.arange(NUM_SLOTS), slot_cards]
+
+    def encode_batch(self, slot_cards):
+        return self.codes[np.arange(NUM_SLOTS), slot_cards].reshape(len(slot_cards), self.dim)
+
+class CardLocationEncoder:
+    # Un bloc de LOCATION_BITS valeurs par carte : la position de la carte plutôt que le contenu des emplacements
+    def __init__(self, name, codes):
+        self.name = name
+        self.codes = codes
+        self.shape = (NUM_CARDS, codes.shape[1])
+        self.dim = NUM_CARDS * codes.shape[1]
+
+    def write(self, view, slot, card):
+        if card >= 0:
+            view[card] = self.codes[slot]
+
+    def write_all(self, view, slot_cards):
+        view[:] = 0
+        present = np.flatnonzero(slot_cards >= 0)
+        view[slot_cards[present]] = self.codes[present]
+
+    def encode_batch(self, slot_cards):
+        out = np.zeros((len(slot_cards),) + self.shape, dtype=np.int32)
+        rows, slots = np.nonzero(slot_cards >= 0)
+        out[rows, slot_cards[rows, slots]] = self.codes[slots]
+        return out.reshape(len(slot_cards), self.dim)
+
+ENCODERS = {
+    "full27": SlotEncoder("full27", SLOT_CODES),
+    "full16": SlotEncoder("full16", build_slot_codes(encode_card_full16, 16)),
+    "card_location": CardLocationEncoder("card_location", build_location_codes()),
+}
+DEFAULT_ENCODER = "full27"
+
+def get_encoder(name=DEFAULT_ENCODER):
+    if name not in ENCODERS:
+        raise ValueError(f"Encodeur inconnu : {name}")
+    return ENCODERS[name]
+
+def encoder_for_dim(dim):
+    # Retrouve l'encodeur d'un modèle sauvegardé à partir de la taille de sa couche d'entrée
+    for encoder in ENCODERS.values():
+        if encoder.dim == dim:
+            return encoder
+    raise ValueError(f"Aucun encodeur de dimension {dim}")
+
 class GameState:
-    def __init__(self):
+    def __init__(self, prove_flags=False):
         self.deck = []
         for color in COLORS:
             for val in range(1, NUM_VALUES+1):
@@ -126,24 +272,64 @@ class GameState:
             self.hands["player"].append(self.deck.pop())
             self.hands["opponent"].append(self.deck.pop())
         self.current_turn = "player"
+        self.flag_counts = {"player": 0, "opponent": 0}
+        self.first_triple = {"player": None, "opponent": None}
+        self.resolved_flags = []
+        self.game_winner = None
+        self.prove_flags = prove_flags
+
+    def _record_flag(self, flag_index):
+        # Mise à jour incrémentale à la résolution d'un drapeau : compteurs,
+        # premier alignement de 3 drapeaux adjacents et vainqueur de la partie.
+        winner = self.flags[flag_index].winner
+        self.resolved_flags.append((flag_index, winner))
+        if winner not in self.flag_counts:
+            return
+        self.flag_counts[winner] += 1
+        for start in range(max(0, flag_index - 2), min(flag_index, len(self.flags) - 3) + 1):
+            if all(self.flags[j].winner == winner for j in range(start, start + 3)):
+                if self.first_triple[winner] is None or start < self.first_triple[winner]:
+                    self.first_triple[winner] = start
+                break
+        if self.flag_counts["player"] >= 5:
+            self.game_winner = "player"
+        elif self.flag_counts["opponent"] >= 5:
+            self.game_winner = "opponent"
+        else:
+            p, o = self.first_triple["player"], self.first_triple["opponent"]
+            if p is not None and (o is None or p < o):
+                self.game_winner = "player"
+            elif o is not None:
+                self.game_winner = "opponent"
+
+    def unseen_card_ids(self):
+        return frozenset([c.id for c in self.deck] + [c.id for p in PLAYERS for c in self.hands[p]])
+
+    def provable_flags(self):
+        # Pour chaque drapeau ouvert, le camp dont la formation est déjà imbattable (sinon None)
+        from flag_prover import prove_flag
+        unseen = self.unseen_card_ids()
+        return [None if f.winner is not None else
+                prove_flag([c.id for c in f.slots["player"]], [c.id for c in f.slots["opponent"]], unseen)
+                for f in self.flags]
+
+    def _apply_flag_proofs(self):
+        for flag_index, winner in enumerate(self.provable_flags()):
+            if winner is not None:
+                self.flags[flag_index].winner = winner
+                self._record_flag(flag_index)
+
+    def has_adjacent(self, player):
+        return self.first_triple[player] is not None
 
     def check_game_over(self):
-        for f in self.flags:
-            if f.is_complete() and f.winner is None:
-                f.winner = f.get_winner()
-        results = [f.winner for f in self.flags]
-        player_flags = sum(1 for r in results if r == "player")
-        opp_flags = sum(1 for r in results if r == "opponent")
-        if player_flags >= 5:
-            return "player"
-        if opp_flags >= 5:
-            return "opponent"
-        for i in range(len(results) - 2):
-            if results[i] == results[i+1] == results[i+2] == "player":
-                return "player"
-            if results[i] == results[i+1] == results[i+2] == "opponent":
-                return "opponent"
-        return None
+        return self.game_winner
+
+    def hand_card_ids(self, side):
+        return [c.id for c in self.hands[PLAYERS[side]]]
+
+    def flag_card_ids(self, flag_index, side):
+        return [c.id for c in self.flags[flag_index].slots[PLAYERS[side]]]
 
     def available_actions(self, player):
         acts = []
@@ -162,20 +348,58 @@ class GameState:
         success, error = flag.add_card(player, self.hands[player][card_index])
         if not success:
             return False, error
+        if flag.winner is not None:
+            self._record_flag(flag_index)
         self.hands[player].pop(card_index)
         if self.deck and len(self.hands[player]) < MAX_HAND_SIZE:
             self.hands[player].append(self.deck.pop())
+        if self.prove_flags:
+            self._apply_flag_proofs()
         self.current_turn = "opponent" if player == "player" else "player"
         return True, ""
 
+def make_state(engine="classic", prove_flags=False):
+    if engine == "classic":
+        return GameState(prove_flags)
+    if engine == "fast":
+        if prove_flags:
+            raise ValueError("La règle de preuve anticipée n'est disponible qu'avec le moteur classique.")
+        from battle_line_fast import FastGameState
+        return FastGameState()
+    raise ValueError(f"Moteur inconnu : {engine}")
+
+def state_slot_cards(state, perspective=0):
+    # Carte de chaque emplacement ; perspective=1 échange les deux camps (vue de l'adversaire)
+    slot_cards = np.full(NUM_SLOTS, -1, dtype=np.int64)
+    for side in range(2):
+        seat = side ^ perspective
+        hand = state.hand_card_ids(side)
+        slot_cards[seat * MAX_HAND_SIZE:seat * MAX_HAND_SIZE + len(hand)] = hand
+        for flag_idx in range(9):
+            cards = state.flag_card_ids(flag_idx, side)
+            base = FLAG_SLOT_START + (flag_idx * 2 + seat) * 3
+            slot_cards[base:base + len(cards)] = cards
+    return slot_cards
+
 class BattleLineGame:
-    def __init__(self):
-        self.state = GameState()
+    def __init__(self, engine="classic", prove_flags=False, encoder=DEFAULT_ENCODER):
+        self.engine = engine
+        self.encoder = get_encoder(encoder)
+        self.state = make_state(engine, prove_flags)
         self.winner = None
         self.move_count = 0
+        self._state_vector = np.zeros(self.encoder.dim, dtype=np.int32)
+        self._state_view = self._state_vector.reshape(self.encoder.shape)
+        self._action_mask = np.zeros(MAX_HAND_SIZE * 9, dtype=bool)
+        self._action_mask_2d = self._action_mask.reshape(MAX_HAND_SIZE, 9)
+        self.resync()
 
     def step(self, player, card_index, flag_index):
         valid, error = self.state.play_move(player, card_index, flag_index)
+        if valid:
+            side = PLAYERS.index(player)
+            self._patch_state_vector(side, card_index, flag_index)
+            self._patch_action_mask(side, flag_index)
         self.move_count += 1
         self.winner = self.state.check_game_over()
         return valid, self.winner, error
@@ -192,47 +416,73 @@ class BattleLineGame:
         print("--------------------------------\n")
 
     def get_valid_actions(self):
-        acts = self.state.available_actions("player")
-        valid = []
-        for (c, f) in acts:
-            valid.append(c * 9 + f)
-        return valid
+        return np.flatnonzero(self._action_mask).tolist()
+
+    def get_action_mask(self, copy=True):
+        return self._action_mask.copy() if copy else self._action_mask
+
+    def resync(self):
+        # À appeler si l'état a été modifié en dehors de step()
+        self.refresh_state_vector()
+        self.refresh_action_mask()
+
+    def refresh_action_mask(self):
+        self._action_mask[:] = False
+        for (c, f) in self.state.available_actions("player"):
+            self._action_mask[c * 9 + f] = True
+        self._mask_hand_size = len(self.state.hand_card_ids(0))
+        self._mask_flags_seen = len(self.state.resolved_flags)
+
+    def _patch_action_mask(self, side, flag_index):
+        # Colonnes des drapeaux fermés depuis le dernier coup, colonne du drapeau joué si le
+        # joueur y a posé sa 3e carte, lignes des emplacements de main vidés (pioche épuisée).
+        mask = self._action_mask_2d
+        if side == 0 and len(self.state.flag_card_ids(flag_index, 0)) == 3:
+            mask[:, flag_index] = False
+        resolved = self.state.resolved_flags
+        for fi, _ in resolved[self._mask_flags_seen:]:
+            mask[:, fi] = False
+        self._mask_flags_seen = len(resolved)
+        hand_size = len(self.state.hand_card_ids(0))
+        if hand_size < self._mask_hand_size:
+            mask[hand_size:self._mask_hand_size] = False
+            self._mask_hand_size = hand_size
 
     def decode_action(self, action):
         c_idx = action // 9
         f_idx = action % 9
         return c_idx, f_idx
 
-    def get_state_vector(self):
-        encodings = []
-        for i in range(MAX_HAND_SIZE):
-            if i < len(self.state.hands["player"]):
-                enc = encode_card_full(self.state.hands["player"][i],
-                                       deposited=False, owner=None, flag=None)
-            else:
-                enc = np.zeros(NBR_BITS, dtype=np.int32)
-            encodings.append(enc)
-        for i in range(MAX_HAND_SIZE):
-            if i < len(self.state.hands["opponent"]):
-                enc = encode_card_full(self.state.hands["opponent"][i],
-                                       deposited=False, owner=None, flag=None)
-            else:
-                enc = np.zeros(NBR_BITS, dtype=np.int32)
-            encodings.append(enc)
-        for flag_idx, flag in enumerate(self.state.flags):
-            for i in range(3):
-                if i < len(flag.slots["player"]):
-                    enc = encode_card_full(flag.slots["player"][i],
-                                           deposited=True, owner="player", flag=flag_idx)
-                else:
-                    enc = np.zeros(NBR_BITS, dtype=np.int32)
-                encodings.append(enc)
-            for i in range(3):
-                if i < len(flag.slots["opponent"]):
-                    enc = encode_card_full(flag.slots["opponent"][i],
-                                           deposited=True, owner="opponent", flag=flag_idx)
-                else:
-                    enc = np.zeros(NBR_BITS, dtype=np.int32)
-                encodings.append(enc)
-        state_vector = np.concatenate(encodings)
-        return state_vector
\ No newline at end of file
+    def slot_cards(self, perspective=0):
+        return state_slot_cards(self.state, perspective)
+
+    def refresh_state_vector(self):
+        self.encoder.write_all(self._state_view, self.slot_cards())
+
+    def get_state_vector_for(self, player):
+        # Observation du point de vue de `player`, pour faire jouer l'adversaire par le réseau
+        if player == "player":
+            return self.get_state_vector()
+        return self.encoder.encode_batch(self.slot_cards(1)[None])[0]
+
+    def get_action_mask_for(self, player):
+        if player == "player":
+            return self.get_action_mask()
+        mask = np.zeros(MAX_HAND_SIZE * 9, dtype=bool)
+        for (c, f) in self.state.available_actions(player):
+            mask[c * 9 + f] = True
+        return mask
+
+    def _patch_state_vector(self, side, card_index, flag_index):
+        # Seuls changent : la carte posée sur le drapeau et la main à partir de la carte jouée
+        # (décalage puis pioche).
+        cards = self.state.flag_card_ids(flag_index, side)
+        slot = FLAG_SLOT_START + (flag_index * 2 + side) * 3 + len(cards) - 1
+        self.encoder.write(self._state_view, slot, cards[-1])
+        hand = self.state.hand_card_ids(side)
+        for i in range(card_index, MAX_HAND_SIZE):
+            slot = side * MAX_HAND_SIZE + i
+            self.encoder.write(self._state_view, slot, hand[i] if i < len(hand) else -1)
+
+    def get_state_vector(self, copy=True):
+        return self._state_vector.copy() if copy else self._state_vector
@@ -0,0 +1,185 @@
+import numpy as np
+
+from battle_line_game import DEFAULT_ENCODER, FORMATION_RANKS, MAX_HAND_SIZE, NUM_CARDS, get_encoder
+
+NUM_FLAGS = 9
+NUM_ACTIONS = MAX_HAND_SIZE * NUM_FLAGS
+PLAYER = 0
+OPPONENT = 1
+DRAW = 2
+NO_WINNER = -1
+
+HAND_INDEX = np.arange(MAX_HAND_SIZE)
+
+
+def clip_final_reward(winner):
+    final_reward = np.where(winner == PLAYER, 50.0, np.where(winner == OPPONENT, -50.0, 0.0))
+    return np.clip(final_reward, -1, 1)
+
+
+# N parties stockées dans des tableaux NumPy et jouées en parallèle. Reproduit les règles
+# et les récompenses de BattleLineEnv.step avec un adversaire aléatoire ; les parties
+# terminées sont relancées automatiquement.
+class VecBattleLineEnv:
+    def __init__(self, num_envs=64, seed=None, encoder=DEFAULT_ENCODER):
+        self.num_envs = num_envs
+        self.encoder = get_encoder(encoder)
+        self.state_dim = self.encoder.dim
+        self.rng = np.random.default_rng(seed)
+        n = num_envs
+        self.deck = np.zeros((n, NUM_CARDS), dtype=np.int16)
+        self.deck_size = np.zeros(n, dtype=np.int16)
+        self.hands = np.full((n, 2, MAX_HAND_SIZE), -1, dtype=np.int16)
+        self.hand_size = np.zeros((n, 2), dtype=np.int16)
+        self.slots = np.full((n, NUM_FLAGS, 2, 3), -1, dtype=np.int16)
+        self.counts = np.zeros((n, NUM_FLAGS, 2), dtype=np.int16)
+        self.winners = np.full((n, NUM_FLAGS), NO_WINNER, dtype=np.int8)
+        self.episode_lengths = np.zeros(n, dtype=np.int32)
+
+    def reset(self):
+        self._reset_rows(np.arange(self.num_envs))
+        return self.get_observations(), self.get_action_masks()
+
+    def _reset_rows(self, rows):
+        k = len(rows)
+        if k == 0:
+            return
+        decks = np.argsort(self.rng.random((k, NUM_CARDS)), axis=1).astype(np.int16)
+        # Distribution alternée depuis le dessus de la pioche, comme GameState
+        dealt = decks[:, ::-1][:, :2 * MAX_HAND_SIZE]
+        self.hands[rows, PLAYER] = dealt[:, 0::2]
+        self.hands[rows, OPPONENT] = dealt[:, 1::2]
+        self.hand_size[rows] = MAX_HAND_SIZE
+        self.deck[rows] = decks
+        self.deck_size[rows] = NUM_CARDS - 2 * MAX_HAND_SIZE
+        self.slots[rows] = -1
+        self.counts[rows] = 0
+        self.winners[rows] = NO_WINNER
+        self.episode_lengths[rows] = 0
+
+    def get_observations(self, rows=None):
+        if rows is None:
+            rows = slice(None)
+        n = len(self.hands[rows])
+        slot_cards = np.concatenate([self.hands[rows].reshape(n, -1), self.slots[rows].reshape(n, -1)], axis=1)
+        return self.encoder.encode_batch(slot_cards)
+
+    def get_action_masks(self, side=PLAYER, rows=None):
+        if rows is None:
+            rows = slice(None)
+        hand_ok = HAND_INDEX < self.hand_size[rows, side, None]
+        flag_ok = (self.winners[rows] == NO_WINNER) & (self.counts[rows, :, side] < 3)
+        return (hand_ok[:, :, None] & flag_ok[:, None, :]).reshape(len(hand_ok), NUM_ACTIONS)
+
+    def _play(self, rows, side, card_idx, flag_idx):
+        cards = self.hands[rows, side, card_idx]
+        counts = self.counts[rows, flag_idx, side]
+        self.slots[rows, flag_idx, side, counts] = cards
+        self.counts[rows, flag_idx, side] = counts + 1
+
+        complete = (self.counts[rows, flag_idx, 1 - side] == 3) & (counts == 2)
+        r, f = rows[complete], flag_idx[complete]
+        s = self.slots[r, f]
+        p = FORMATION_RANKS[s[:, 0, 0], s[:, 0, 1], s[:, 0, 2]]
+        o = FORMATION_RANKS[s[:, 1, 0], s[:, 1, 1], s[:, 1, 2]]
+        self.winners[r, f] = np.where(p > o, PLAYER, np.where(o > p, OPPONENT, DRAW))
+
+        # Retrait de la carte jouée (décalage à gauche) puis pioche éventuelle
+        src = np.minimum(HAND_INDEX + (HAND_INDEX >= card_idx[:, None]), MAX_HAND_SIZE - 1)
+        hands = np.take_along_axis(self.hands[rows, side], src, axis=1)
+        sizes = self.hand_size[rows, side] - 1
+        hands[HAND_INDEX >= sizes[:, None]] = -1
+        draw = np.flatnonzero(self.deck_size[rows] > 0)
+        deck_sizes = self.deck_size[rows[draw]] - 1
+        hands[draw, sizes[draw]] = self.deck[rows[draw], deck_sizes]
+        self.deck_size[rows[draw]] = deck_sizes
+        sizes[draw] += 1
+        self.hands[rows, side] = hands
+        self.hand_size[rows, side] = sizes
+
+    def game_results(self, rows):
+        w = self.winners[rows]
+        results = np.full(len(rows), NO_WINNER, dtype=np.int8)
+        triple_p = (w[:, :-2] == PLAYER) & (w[:, 1:-1] == PLAYER) & (w[:, 2:] == PLAYER)
+        triple_o = (w[:, :-2] == OPPONENT) & (w[:, 1:-1] == OPPONENT) & (w[:, 2:] == OPPONENT)
+        any_triple = triple_p | triple_o
+        first = any_triple.argmax(axis=1)
+        results = np.where(any_triple.any(axis=1),
+                           np.where(triple_p[np.arange(len(rows)), first], PLAYER, OPPONENT), results)
+        results = np.where((w == OPPONENT).sum(axis=1) >= 5, OPPONENT, results)
+        results = np.where((w == PLAYER).sum(axis=1) >= 5, PLAYER, results)
+        return results
+
+    def _capture_rewards(self, rows, previous):
+        new = (previous == NO_WINNER) & (self.winners[rows] != NO_WINNER)
+        gained = (new & (self.winners[rows] == PLAYER)).sum(axis=1)
+        lost = (new & (self.winners[rows] == OPPONENT)).sum(axis=1)
+        return 0.2 * gained - 0.2 * lost
+
+    def _random_opponent(self, rows):
+        masks = self.get_action_masks(OPPONENT, rows)
+        keys = self.rng.random(masks.shape)
+        keys[~masks] = -1.0
+        has_move = masks.any(axis=1)
+        actions = keys.argmax(axis=1)
+        rows = rows[has_move]
+        actions = actions[has_move]
+        if len(rows):
+            self._play(rows, OPPONENT, actions // NUM_FLAGS, actions % NUM_FLAGS)
+
+    def step(self, actions):
+        n = self.num_envs
+        actions = np.asarray(actions, dtype=np.int64)
+        rewards = np.zeros(n, dtype=np.float64)
+        dones = np.zeros(n, dtype=bool)
+        winners = np.full(n, NO_WINNER, dtype=np.int8)
+        all_rows = np.arange(n)
+
+        masks = self.get_action_masks()
+        no_moves = ~masks.any(axis=1)
+        in_range = (actions >= 0) & (actions < NUM_ACTIONS)
+        legal = in_range & masks[all_rows, np.where(in_range, actions, 0)]
+
+        # Plus aucun coup : la partie se termine sur l'état courant
+        rows = all_rows[no_moves]
+        winners[rows] = self.game_results(rows)
+        rewards[rows] = clip_final_reward(winners[rows])
+        dones[rows] = True
+
+        # Action illégale : pénalité et fin de partie
+        rows = all_rows[~no_moves & ~legal]
+        rewards[rows] = -0.1
+        dones[rows] = True
+
+        rows = all_rows[~no_moves & legal]
+        previous = self.winners[rows].copy()
+        self._play(rows, PLAYER, actions[rows] // NUM_FLAGS, actions[rows] % NUM_FLAGS)
+        self.episode_lengths[rows] += 1
+        rewards[rows] = 0.01 + self._capture_rewards(rows, previous)
+        results = self.game_results(rows)
+        ended = results != NO_WINNER
+        winners[rows[ended]] = results[ended]
+        rewards[rows[ended]] += clip_final_reward(results[ended])
+        dones[rows[ended]] = True
+
+        rows = rows[~ended]
+        previous = self.winners[rows].copy()
+        self._random_opponent(rows)
+        rewards[rows] += self._capture_rewards(rows, previous)
+        results = self.game_results(rows)
+        ended = results != NO_WINNER
+        winners[rows[ended]] = results[ended]
+        rewards[rows[ended]] += clip_final_reward(results[ended])
+        dones[rows[ended]] = True
+        rows = rows[~ended]
+        rewards[rows] = np.clip(rewards[rows], -1, 1)
+
+        finished = all_rows[dones]
+        info = {
+            "winner": winners,
+            "final_obs": self.get_observations(finished) if len(finished) else np.zeros((0, self.state_dim), dtype=np.int32),
+            "final_rows": finished,
+            "episode_length": self.episode_lengths[finished].copy(),
+        }
+        self._reset_rows(finished)
+        return self.get_observations(), self.get_action_masks(), rewards, dones, info
@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+import torch
+
+from battle_line_game import CARDS, NUM_CARDS, Flag, evaluate_hand, formation_rank
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "benchmark_baseline.json")
+SEED = 0
+
+
+def seed_all(seed=SEED):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def measure(fn, ops, repeats, warmup=True):
+    # Meilleur des `repeats` passages (le moins bruité pour des micro-mesures), en µs par opération ;
+    # un passage d'échauffement d'abord (caches, allocations, fréquence du processeur)
+    if warmup:
+        fn()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best / ops * 1e6
+
+
+def random_triples(n):
+    return [[CARDS[i] for i in random.sample(range(NUM_CARDS), 3)] for _ in range(n)]
+
+
+def midgame_states(n, engine="classic"):
+    # États atteints par des parties aléatoires à graine fixe
+    from battle_line_game import make_state
+    states = []
+    while len(states) < n:
+        state = make_state(engine)
+        turn = 0
+        while state.check_game_over() is None:
+            player = ("player", "opponent")[turn]
+            actions = state.available_actions(player)
+            if not actions:
+                break
+            state.play_move(player, *random.choice(actions))
+            turn = 1 - turn
+            if random.random() < 0.1:
+                states.append(state)
+                break
+    return states
+
+
+def bench_evaluate_hand(scale):
+    hands = random_triples(10000 * scale)
+    return lambda: [evaluate_hand(h) for h in hands], len(hands)
+
+
+def bench_formation_rank(scale):
+    hands = random_triples(10000 * scale)
+    return lambda: [formation_rank(h) for h in hands], len(hands)
+
+
+def bench_flag_get_winner(scale):
+    flags = []
+    for _ in range(5000 * scale):
+        ids = random.sample(range(NUM_CARDS), 6)
+        flag = Flag()
+        flag.slots["player"] = [CARDS[i] for i in ids[:3]]
+        flag.slots["opponent"] = [CARDS[i] for i in ids[3:]]
+        flags.append(flag)
+    return lambda: [f.get_winner() for f in flags], len(flags)
+
+
+def bench_available_actions(scale):
+    states = midgame_states(200 * scale)
+    return lambda: [s.available_actions("player") for s in states], len(states)
+
+
+def bench_fast_legal_moves(scale):
+    states = midgame_states(200 * scale, "fast")
+    return lambda: [s.legal_moves(0) for s in states], len(states)
+
+
+def bench_get_state_vector(scale):
+    from battle_line_game import BattleLineGame
+    game = BattleLineGame()
+    n = 20000 * scale
+    return lambda: [game.get_state_vector() for _ in range(n)], n
+
+
+def bench_refresh_state_vector(scale):
+    from battle_line_game import BattleLineGame
+    game = BattleLineGame()
+    n = 2000 * scale
+    return lambda: [game.refresh_state_vector() for _ in range(n)], n
+
+
+def _random_episodes(env, n):
+    steps = 0
+    for _ in range(n):
+        env.reset()
+        done = False
+        while not done:
+            mask = env.get_action_mask()
+            if not mask.any():
+                break
+            _, _, done, _ = env.step(int(random.choice(np.flatnonzero(mask))))
+            steps += 1
+    return steps
+
+
+def bench_env_step(scale):
+    from battle_line_env import BattleLineEnv
+    env = BattleLineEnv()
+    n = 10 * scale
+    # Nombre de pas fixe grâce à la graine réinitialisée avant chaque passage
+    seed_all()
+    steps = _random_episodes(env, n)
+
+    def run():
+        seed_all()
+        _random_episodes(env, n)
+    return run, steps
+
+
+def bench_env_reset(scale):
+    from battle_line_env import BattleLineEnv
+    env = BattleLineEnv()
+    n = 500 * scale
+    return lambda: [env.reset() for _ in range(n)], n
+
+
+def bench_vec_env_step(scale):
+    from battle_line_vec_env import VecBattleLineEnv
+    env = VecBattleLineEnv(256, seed=SEED)
+    _, masks = env.reset()
+    rng = np.random.default_rng(SEED)
+    n = 20 * scale
+
+    def run():
+        nonlocal masks
+        for _ in range(n):
+            keys = rng.random(masks.shape)
+            keys[~masks] = -1.0
+            _, masks, _, _, _ = env.step(keys.argmax(axis=1))
+    return run, n * env.num_envs
+
+
+def _agent(**kwargs):
+    from dqn_agent import DQNAgent
+    torch.set_num_threads(1)
+    return DQNAgent(1836, 63, **kwargs)
+
+
+def bench_select_action(scale):
+    from battle_line_env import BattleLineEnv
+    agent = _agent(epsilon=0.0)
+    env = BattleLineEnv()
+    state, mask = env.reset(), env.get_action_mask()
+    n = 200 * scale
+    return lambda: [agent.select_action(state, mask) for _ in range(n)], n
+
+
+def bench_update(scale):
+    agent = _agent()
+    rng = np.random.default_rng(SEED)
+    for i in range(2000):
+        agent.store_transition(rng.integers(0, 2, 1836), i % 63, 0.01, rng.integers(0, 2, 1836), i % 25 == 0)
+    n = 5 * scale
+    return lambda: [agent.update() for _ in range(n)], n
+
+
+def bench_episode_random(scale):
+    from battle_line_env import BattleLineEnv
+    env = BattleLineEnv()
+    n = 10 * scale
+
+    def run():
+        seed_all()
+        _random_episodes(env, n)
+    return run, n
+
+
+def bench_episode_training(scale):
+    # Épisode complet de entrainer_agent : choix d'action, pas d'env, stockage et mise à jour
+    from battle_line_env import BattleLineEnv
+    env = BattleLineEnv()
+    agent = _agent(batch_size=64)
+    rng = np.random.default_rng(SEED)
+    for i in range(256):
+        agent.store_transition(rng.integers(0, 2, 1836), i % 63, 0.01, rng.integers(0, 2, 1836), False)
+    n = scale
+
+    def run():
+        for _ in range(n):
+            state = env.reset()
+            done = False
+            while not done:
+                mask = env.get_action_mask()
+                if not mask.any():
+                    break
+                action = agent.select_action(state, mask)
+                next_state, reward, done, _ = env.step(action)
+                agent.store_transition(state, action, reward, next_state, done)
+                agent.update()
+                state = next_state
+    return run, n
+
+
+BENCHMARKS = {
+    "evaluate_hand": bench_evaluate_hand,
+    "formation_rank": bench_formation_rank,
+    "flag_get_winner": bench_flag_get_winner,
+    "available_actions": bench_available_actions,
+    "fast_legal_moves": bench_fast_legal_moves,
+    "get_state_vector": bench_get_state_vector,
+    "refresh_state_vector": bench_refresh_state_vector,
+    "env_step": bench_env_step,
+    "env_reset": bench_env_reset,
+    "vec_env_step": bench_vec_env_step,
+    "select_action": bench_select_action,
+    "update": bench_update,
+    "episode_random": bench_episode_random,
+    "episode_training": bench_episode_training,
+}
+# Mesure lente : un seul passage, sans échauffement
+SLOW = {"episode_training"}
+
+
+def run_benchmarks(names, scale=1, repeats=5):
+    results = {}
+    for name in names:
+        seed_all()
+        fn, ops = BENCHMARKS[name](scale)
+        slow = name in SLOW
+        us = measure(fn, ops, 1 if slow else repeats, warmup=not slow)
+        results[name] = {"us_per_op": us, "ops_per_second": 1e6 / us}
+        print(f"{name:<22} {us:12.3f} µs/op {1e6 / us:14.1f} op/s")
+    return results
+
+
+def metadata():
+    return {
+        "python": sys.version.split()[0], "numpy": np.__version__, "torch": torch.__version__,
+        "platform": platform.platform(), "processor": platform.processor(), "cpu_count": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, tolerance):
+    # Régression : plus lent que la référence au-delà de la tolérance relative
+    regressions = []
+    print(f"\n{'Mesure':<22} {'Référence':>12} {'Actuel':>12} {'Rapport':>9}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["us_per_op"], result["us_per_op"]
+        ratio = after / before
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  RÉGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            flag = "  amélioration"
+        print(f"{name:<22} {before:12.3f} {after:12.3f} {ratio:8.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de mesures du moteur, de l'environnement et de l'apprenant")
+    parser.add_argument("--only", default=None, help="liste de mesures séparées par des virgules")
+    parser.add_argument("--scale", type=int, default=1, help="multiplie la taille des charges")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", default=None, help="écrit les résultats dans ce fichier")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="enregistre ces résultats comme référence")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="écart relatif toléré avant de signaler une régression")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"mesures inconnues : {', '.join(unknown)}")
+    report = {"meta": metadata(), "results": run_benchmarks(names, args.scale, args.repeats)}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)["results"]
+        baseline.update(report["results"])
+        with open(args.baseline, "w") as f:
+            json.dump({"meta": report["meta"], "results": baseline}, f, indent=2)
+        print(f"\nRéférence enregistrée : {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(report["results"], json.load(f)["results"], args.tolerance)
+        if regressions:
+            print(f"\nRégressions : {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
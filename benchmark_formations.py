@@ -0,0 +1,72 @@
+import itertools
+import random
+import time
+
+import numpy as np
+
+from battle_line_game import CARDS, FORMATION_RANKS, Flag, NUM_CARDS, build_formation_ranks, evaluate_hand, formation_rank
+
+N_TRIPLES = 100000
+
+
+def chrono(fn, repetitions=1):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        fn()
+    return (time.perf_counter() - debut) / repetitions
+
+
+def verifier_ordre():
+    # Le rang doit ordonner les formations exactement comme les tuples d'evaluate_hand.
+    triples = list(itertools.combinations(range(NUM_CARDS), 3))
+    cles = sorted(triples, key=lambda t: evaluate_hand([CARDS[i] for i in t]))
+    precedent_tuple, precedent_rang = None, 0
+    for t in cles:
+        tup = evaluate_hand([CARDS[i] for i in t])
+        rang = int(FORMATION_RANKS[t])
+        if precedent_tuple is not None:
+            assert (tup > precedent_tuple) == (rang > precedent_rang), (t, tup, rang)
+        precedent_tuple, precedent_rang = tup, rang
+    print(f"Ordre vérifié sur {len(triples)} formations ({int(FORMATION_RANKS.max())} rangs distincts).")
+
+
+def main():
+    random.seed(0)
+    verifier_ordre()
+
+    triples = [random.sample(range(NUM_CARDS), 3) for _ in range(N_TRIPLES)]
+    mains = [[CARDS[i] for i in t] for t in triples]
+    ids = np.array(triples)
+
+    t_tuple = chrono(lambda: [evaluate_hand(m) for m in mains])
+    t_rang = chrono(lambda: [formation_rank(m) for m in mains])
+    t_vect = chrono(lambda: FORMATION_RANKS[ids[:, 0], ids[:, 1], ids[:, 2]], 10)
+
+    drapeaux = []
+    for m, t in zip(mains[:10000], triples[10000:20000]):
+        f = Flag()
+        f.slots["player"] = list(m)
+        f.slots["opponent"] = [CARDS[i] for i in t]
+        drapeaux.append(f)
+
+    def gagnant_tuple(f):
+        p = evaluate_hand(f.slots["player"])
+        o = evaluate_hand(f.slots["opponent"])
+        return "player" if p > o else "opponent" if o > p else "draw"
+
+    t_flag_tuple = chrono(lambda: [gagnant_tuple(f) for f in drapeaux])
+    t_flag_rang = chrono(lambda: [f.get_winner() for f in drapeaux])
+    assert [gagnant_tuple(f) for f in drapeaux] == [f.get_winner() for f in drapeaux]
+
+    t_build = chrono(build_formation_ranks)
+
+    print(f"evaluate_hand (tuples)      : {t_tuple / N_TRIPLES * 1e9:8.0f} ns / formation")
+    print(f"formation_rank (table)      : {t_rang / N_TRIPLES * 1e9:8.0f} ns / formation")
+    print(f"FORMATION_RANKS vectorisé   : {t_vect / N_TRIPLES * 1e9:8.1f} ns / formation")
+    print(f"Flag.get_winner (tuples)    : {t_flag_tuple / len(drapeaux) * 1e9:8.0f} ns / drapeau")
+    print(f"Flag.get_winner (table)     : {t_flag_rang / len(drapeaux) * 1e9:8.0f} ns / drapeau")
+    print(f"Construction de la table    : {t_build * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import random
+import threading
+
+import numpy as np
+import torch
+
+
+def capture_rng():
+    # Tous les tirages de l'entraînement passent par ces trois générateurs globaux
+    # (donne, adversaire aléatoire, epsilon-greedy, tirages du rejeu, dropout)
+    return {"python": random.getstate(), "numpy": np.random.get_state(), "torch": torch.get_rng_state()}
+
+
+def restore_rng(state):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+
+
+def load_checkpoint(path):
+    return torch.load(path, map_location="cpu", weights_only=False)
+
+
+class CheckpointWriter:
+    # Écriture sur disque dans un fil d'arrière-plan : la boucle d'entraînement ne fait que la copie
+    # en mémoire. Fichier temporaire puis os.replace, pour ne jamais laisser de point de reprise tronqué.
+    # Si une écriture est encore en cours, seul le plus récent des points en attente est conservé.
+    def __init__(self, path):
+        self.path = path
+        self.pending = None
+        self.busy = False
+        self.closed = False
+        self.saved = 0
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, snapshot):
+        with self.cond:
+            self.pending = snapshot
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.pending is None and not self.closed:
+                    self.cond.wait()
+                if self.pending is None:
+                    return
+                snapshot, self.pending = self.pending, None
+                self.busy = True
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            tmp = self.path + ".tmp"
+            try:
+                torch.save(snapshot, tmp)
+                os.replace(tmp, self.path)
+                self.saved += 1
+            except OSError as e:
+                print(f"Échec de l'écriture du point de reprise {self.path} : {e}")
+            finally:
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+
+    def wait(self):
+        with self.cond:
+            while self.pending is not None or self.busy:
+                self.cond.wait()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
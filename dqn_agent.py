@@ -1,3 +1,4 @@
+import copy
 import os
 import torch
 import torch.nn as nn
@@ -5,6 +6,9 @@ import torch.optim as optim
 import random
 import numpy as np
 
+from profiler import NULL_PROFILER
+from replay_buffer import MemmapReplayBuffer, PrioritizedReplayBuffer, ReplayBuffer
+
 
 class DQN(nn.Module):
     def __init__(self, state_dim, action_dim):
@@ -26,14 +30,13 @@ class DQN(nn.Module):
     def forward(self, x):
         return self.net(x)
 
-    def save(self, file_name='model.pth'):
-        model_folder_path = './model'
+    def save(self, file_name='model.pth', model_folder_path='./model'):
         os.makedirs(model_folder_path, exist_ok=True)
         torch.save(self.state_dict(), os.path.join(model_folder_path, file_name))
 
 
 class DQNAgent:
-    def __init__(self, state_dim, action_dim, lr=1e-5, gamma=0.99, epsilon=1.0, epsilon_min=0.05, epsilon_decay=0.995, batch_size=64, tau=0.005):
+    def __init__(self, state_dim, action_dim, lr=1e-5, gamma=0.99, epsilon=1.0, epsilon_min=0.05, epsilon_decay=0.995, batch_size=64, tau=0.005, prioritized_replay=False, per_alpha=0.6, per_beta=0.4, replay_path=None, memory_capacity=100000, update_every=1, gradient_steps=1):
         self.state_dim = state_dim
         self.action_dim = action_dim
         self.gamma = gamma
@@ -42,67 +45,123 @@ class DQNAgent:
         self.epsilon_decay = epsilon_decay
         self.batch_size = batch_size
         self.tau = tau
+        # Calendrier de l'apprenant : gradient_steps pas de gradient tous les update_every appels à update()
+        if update_every < 1 or gradient_steps < 1:
+            raise ValueError("update_every et gradient_steps doivent valoir au moins 1")
+        self.update_every = update_every
+        self.gradient_steps = gradient_steps
+        self.update_calls = 0
 
         self.policy_net = DQN(state_dim, action_dim)
         self.target_net = DQN(state_dim, action_dim)
         self.target_net.load_state_dict(self.policy_net.state_dict())
         self.target_net.eval()
+        self._policy_params = list(self.policy_net.parameters())
+        self._target_params = list(self.target_net.parameters())
 
         self.optimizer = optim.Adam(self.policy_net.parameters(), lr=lr, weight_decay=1e-4)
-        self.memory = []
-        self.memory_capacity = 100000
-        self.loss_fn = nn.SmoothL1Loss()
+        self.memory_capacity = memory_capacity
+        if replay_path is not None:
+            # Mémoire sur disque : reprise automatique si replay_path contient déjà des transitions
+            if prioritized_replay:
+                raise ValueError("prioritized_replay n'est pas disponible avec replay_path")
+            self.memory = MemmapReplayBuffer(replay_path, memory_capacity, state_dim)
+        elif prioritized_replay:
+            self.memory = PrioritizedReplayBuffer(self.memory_capacity, state_dim, alpha=per_alpha, beta=per_beta)
+        else:
+            self.memory = ReplayBuffer(self.memory_capacity, state_dim)
+        self.loss_fn = nn.SmoothL1Loss(reduction="none")
+        # PhaseProfiler facultatif : découpe de learn_step (tirage, passes avant, rétropropagation)
+        self.profiler = NULL_PROFILER
 
-    def select_action(self, state, valid_actions):
+    def select_action(self, state, action_mask):
         if random.random() < self.epsilon:
-            return random.choice(valid_actions)
+            return int(random.choice(np.flatnonzero(action_mask)))
         else:
-            state_tensor = torch.FloatTensor(state).unsqueeze(0)
+            state_tensor = torch.as_tensor(state, dtype=torch.float32).unsqueeze(0)
             with torch.no_grad():
-                q_values = self.policy_net(state_tensor).squeeze().numpy()
-            masked_q = np.full(self.action_dim, -np.inf)
-            for a in valid_actions:
-                masked_q[a] = q_values[a]
-            return int(np.argmax(masked_q))
+                q_values = self.policy_net(state_tensor).squeeze(0)
+            return int(torch.where(torch.as_tensor(action_mask), q_values, -torch.inf).argmax())
 
-    def store_transition(self, state, action, reward, next_state, done):
-        if len(self.memory) >= self.memory_capacity:
-            self.memory.pop(0)
-        self.memory.append((state, action, reward, next_state, done))
+    def select_actions(self, states, action_masks):
+        # Version par lot (VecBattleLineEnv) : exploration epsilon ligne par ligne
+        masks_t = torch.as_tensor(action_masks)
+        with torch.no_grad():
+            q_values = self.policy_net(torch.as_tensor(states, dtype=torch.float32))
+        actions = torch.where(masks_t, q_values, -torch.inf).argmax(dim=1).numpy()
+        explore = np.random.random(len(actions)) < self.epsilon
+        if explore.any():
+            keys = np.random.random(action_masks[explore].shape)
+            keys[~action_masks[explore]] = -1.0
+            actions[explore] = keys.argmax(axis=1)
+        return actions
+
+    def store_transition(self, state, action, reward, next_state, done, discount=None):
+        # discount : γ^k pour une transition à k pas (NStepAccumulator), γ par défaut
+        self.memory.add(state, action, reward, next_state, done, self.gamma if discount is None else discount)
 
     def update(self):
         if len(self.memory) < self.batch_size:
             return
+        self.update_calls += 1
+        if self.update_calls % self.update_every != 0:
+            return
+        for _ in range(self.gradient_steps):
+            loss = self.learn_step()
+        self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
 
-        batch = random.sample(self.memory, self.batch_size)
-        states, actions, rewards, next_states, dones = zip(*batch)
-
-        states_t = torch.FloatTensor(np.array(states, dtype=np.float32))
-        next_states_t = torch.FloatTensor(np.array(next_states, dtype=np.float32))
-        actions_t = torch.LongTensor(np.array(actions, dtype=np.int64))
-        rewards_t = torch.FloatTensor(np.array(rewards, dtype=np.float32))
-        dones_t = torch.FloatTensor(np.array(dones, dtype=np.float32))
-
-        q_values = self.policy_net(states_t).gather(1, actions_t.unsqueeze(1)).squeeze(1)
-
-        with torch.no_grad():
-            next_actions = self.policy_net(next_states_t).argmax(dim=1)
-            next_q_values = self.target_net(next_states_t).gather(1, next_actions.unsqueeze(1)).squeeze(1)
-            target_q = rewards_t + (1 - dones_t) * self.gamma * next_q_values
-
-        loss = self.loss_fn(q_values, target_q)
+        loss = loss.item()
+        if random.randint(0, 1000) < 1:
+            print(f"Loss: {loss:.4f}")
+        return loss
 
-        self.optimizer.zero_grad()
-        loss.backward()
-        nn.utils.clip_grad_norm_(self.policy_net.parameters(), 1.0)
-        self.optimizer.step()
+    def learn_step(self):
+        profiler = self.profiler
+        with profiler.phase("update.sample"):
+            states_t, actions_t, rewards_t, next_states_t, dones_t, discounts_t, weights_t, idx = self.memory.sample(self.batch_size)
 
-        self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
-        self.soft_update()
+        with profiler.phase("update.forward"):
+            # Une seule passe avant pour s et s' : la moitié s' ne sert qu'au choix d'action (Double-DQN)
+            q_all = self.policy_net(torch.cat((states_t, next_states_t)))
+            q_values = q_all[:self.batch_size].gather(1, actions_t.unsqueeze(1)).squeeze(1)
 
-        if random.randint(0, 1000) < 1:
-            print(f"Loss: {loss.item():.4f}")
+            with torch.no_grad():
+                next_actions = q_all[self.batch_size:].argmax(dim=1)
+                next_q_values = self.target_net(next_states_t).gather(1, next_actions.unsqueeze(1)).squeeze(1)
+                target_q = rewards_t + (1 - dones_t) * discounts_t * next_q_values
+
+            loss = (weights_t * self.loss_fn(q_values, target_q)).mean()
+        self.memory.update_priorities(idx, (q_values - target_q).detach().numpy())
+
+        with profiler.phase("update.backward"):
+            self.optimizer.zero_grad()
+            loss.backward()
+            nn.utils.clip_grad_norm_(self.policy_net.parameters(), 1.0)
+            self.optimizer.step()
+        with profiler.phase("update.soft_update"):
+            self.soft_update()
+        return loss
+
+    def state_dict(self):
+        # Copie complète (tenseurs clonés) : peut être sérialisée en arrière-plan pendant que l'entraînement continue
+        return {
+            "policy_net": {k: v.clone() for k, v in self.policy_net.state_dict().items()},
+            "target_net": {k: v.clone() for k, v in self.target_net.state_dict().items()},
+            "optimizer": copy.deepcopy(self.optimizer.state_dict()),
+            "epsilon": self.epsilon,
+            "update_calls": self.update_calls,
+            "memory": self.memory.state_dict(),
+        }
+
+    def load_state_dict(self, state):
+        self.policy_net.load_state_dict(state["policy_net"])
+        self.target_net.load_state_dict(state["target_net"])
+        self.optimizer.load_state_dict(state["optimizer"])
+        self.epsilon = state["epsilon"]
+        self.update_calls = state["update_calls"]
+        self.memory.load_state_dict(state["memory"])
 
     def soft_update(self):
-        for target_param, param in zip(self.target_net.parameters(), self.policy_net.parameters()):
-            target_param.data.copy_(self.tau * param.data + (1.0 - self.tau) * target_param.data)
+        with torch.no_grad():
+            torch._foreach_mul_(self._target_params, 1.0 - self.tau)
+            torch._foreach_add_(self._target_params, self._policy_params, alpha=self.tau)
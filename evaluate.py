@@ -0,0 +1,194 @@
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+
+from battle_line_game import PLAYERS, BattleLineGame, encoder_for_dim, state_slot_cards
+
+NUM_FLAGS = 9
+
+
+class RandomPolicy:
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def __call__(self, game, player):
+        return self.rng.choice(game.state.available_actions(player))
+
+
+class HeuristicPolicy:
+    # Joue le coup qui maximise le meilleur rang encore atteignable sur le drapeau visé (flag_prover),
+    # avec un petit bonus pour les drapeaux où l'adversaire est déjà engagé
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def __call__(self, game, player):
+        from flag_prover import best_completion
+        state = game.state
+        side = PLAYERS.index(player)
+        hand = state.hand_card_ids(side)
+        unseen = state.unseen_card_ids()
+        best, best_score = None, -math.inf
+        for c, f in state.available_actions(player):
+            mine = state.flag_card_ids(f, side) + [hand[c]]
+            score = best_completion(mine, unseen - {hand[c]}) + 10 * len(state.flag_card_ids(f, 1 - side))
+            score += self.rng.random()
+            if score > best_score:
+                best, best_score = (c, f), score
+        return best
+
+
+class QPolicy:
+    # Argmax glouton masqué des Q-valeurs (aucune exploration) ; l'observation est construite avec
+    # l'encodeur du modèle, vue du camp qui joue
+    def __init__(self, model, state_dim):
+        self.model = model
+        self.encoder = encoder_for_dim(state_dim)
+
+    def __call__(self, game, player):
+        state = self.encoder.encode_batch(state_slot_cards(game.state, PLAYERS.index(player))[None])[0]
+        mask = game.get_action_mask_for(player)
+        with torch.inference_mode():
+            q_values = self.model(torch.as_tensor(state, dtype=torch.float32).unsqueeze(0))[0].numpy()
+        action = int(np.argmax(np.where(mask, q_values, -np.inf)))
+        return action // NUM_FLAGS, action % NUM_FLAGS
+
+
+def make_policy(spec, seed=None):
+    # "random", "heuristic", "ismcts[:secondes]", "checkpoint:chemin" (point de reprise de main.py),
+    # ou un modèle .pth / .pt / .onnx (model_export.load_policy_model)
+    if spec == "random":
+        return RandomPolicy(seed)
+    if spec == "heuristic":
+        return HeuristicPolicy(seed)
+    if spec.startswith("ismcts"):
+        from ismcts_agent import ISMCTSAgent
+        budget = float(spec.split(":", 1)[1]) if ":" in spec else 0.1
+        return ISMCTSAgent(time_budget=budget, seed=seed)
+    if spec.startswith("checkpoint:"):
+        from checkpoint import load_checkpoint
+        from dqn_agent import DQN
+        state_dict = load_checkpoint(spec.split(":", 1)[1])["agent"]["policy_net"]
+        state_dim = state_dict["net.0.weight"].shape[0]
+        net = DQN(state_dim, NUM_FLAGS * 7)
+        net.load_state_dict(state_dict)
+        net.eval()
+        return QPolicy(net, state_dim)
+    from model_export import load_policy_model
+    return QPolicy(*load_policy_model(spec))
+
+
+def play_game(policies, first, seed):
+    # policies[i] joue le camp PLAYERS[i] ; `first` commence. Un camp sans coup légal passe son tour,
+    # la partie s'arrête quand aucun des deux ne peut jouer.
+    random.seed(seed)
+    for i, policy in enumerate(policies):
+        if hasattr(policy, "rng"):
+            policy.rng.seed(seed * 2 + i)
+    game = BattleLineGame(engine="fast")
+    turn = first
+    plies = 0
+    while game.state.check_game_over() is None:
+        player = PLAYERS[turn]
+        if not game.state.available_actions(player):
+            if not game.state.available_actions(PLAYERS[1 - turn]):
+                break
+            turn = 1 - turn
+            continue
+        card_index, flag_index = policies[turn](game, player)
+        game.step(player, card_index, flag_index)
+        plies += 1
+        turn = 1 - turn
+    return game.state.check_game_over(), plies
+
+
+_worker = {}
+
+
+def _init_worker(spec_a, spec_b):
+    # Générateurs des politiques réinitialisés à chaque partie : résultats indépendants de la répartition
+    torch.set_num_threads(1)
+    _worker["policies"] = (make_policy(spec_a), make_policy(spec_b))
+
+
+def _play_chunk(games):
+    results = []
+    for first, seed in games:
+        winner, plies = play_game(_worker["policies"], first, seed)
+        results.append((first, winner, plies))
+    return results
+
+
+def wilson(successes, n, z=1.96):
+    if n == 0:
+        return 0.0, 0.0
+    p = successes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def evaluate(spec_a, spec_b, games=1000, workers=None, seed=0, chunk=25):
+    # A joue toujours le camp "player" ; la moitié des parties commence par B
+    workers = workers or os.cpu_count() or 1
+    schedule = [(i % 2, seed + i) for i in range(games)]
+    chunks = [schedule[i:i + chunk] for i in range(0, games, chunk)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(spec_a, spec_b)) as pool:
+        results = [r for rs in pool.map(_play_chunk, chunks) for r in rs]
+    elapsed = time.perf_counter() - start
+
+    report = {"a": spec_a, "b": spec_b, "games": games, "workers": workers, "seconds": elapsed,
+              "games_per_second": games / elapsed}
+    for label, rows in (("total", results), ("a_first", [r for r in results if r[0] == 0]),
+                        ("b_first", [r for r in results if r[0] == 1])):
+        n = len(rows)
+        wins = sum(1 for _, w, _ in rows if w == "player")
+        losses = sum(1 for _, w, _ in rows if w == "opponent")
+        draws = n - wins - losses
+        report[label] = {
+            "games": n, "wins": wins, "draws": draws, "losses": losses,
+            "win_rate": wins / n if n else 0.0, "win_ci95": wilson(wins, n),
+            "draw_ci95": wilson(draws, n), "loss_ci95": wilson(losses, n),
+            "score": (wins + 0.5 * draws) / n if n else 0.0,
+            "mean_length": float(np.mean([p for _, _, p in rows])) if n else 0.0,
+        }
+    return report
+
+
+def print_report(report):
+    print(f"{report['a']} contre {report['b']} : {report['games']} parties, "
+          f"{report['games_per_second']:.1f} parties/s ({report['workers']} processus)")
+    for label, name in (("total", "Total"), ("a_first", "A commence"), ("b_first", "B commence")):
+        r = report[label]
+        lo, hi = r["win_ci95"]
+        print(f"  {name:<11} V/N/D {r['wins']}/{r['draws']}/{r['losses']} | victoire {r['win_rate']:.3f} "
+              f"[{lo:.3f}, {hi:.3f}] | score {r['score']:.3f} | longueur moyenne {r['mean_length']:.1f} coups")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Évaluation face à face de deux politiques")
+    parser.add_argument("a", help="random, heuristic, ismcts[:s], checkpoint:chemin ou modèle .pth/.pt/.onnx")
+    parser.add_argument("b")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="écrit le rapport dans ce fichier")
+    args = parser.parse_args()
+    report = evaluate(args.a, args.b, args.games, args.workers, args.seed)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import itertools
+
+import numpy as np
+
+from battle_line_game import FORMATION_RANKS, NUM_CARDS
+
+# Tables de meilleure complétion, triées par rang décroissant : la meilleure formation
+# encore réalisable est la première dont toutes les cartes manquantes sont disponibles.
+_TRIPLES = np.array(list(itertools.combinations(range(NUM_CARDS), 3)), dtype=np.int64)
+_TRIPLE_RANKS = FORMATION_RANKS[_TRIPLES[:, 0], _TRIPLES[:, 1], _TRIPLES[:, 2]]
+_ORDER = np.argsort(-_TRIPLE_RANKS, kind="stable")
+BEST_TRIPLES = _TRIPLES[_ORDER]
+BEST_TRIPLE_RANKS = _TRIPLE_RANKS[_ORDER]
+
+_PAIRS = np.array(list(itertools.combinations(range(NUM_CARDS), 2)), dtype=np.int64)
+BEST_PAIRS = np.zeros((NUM_CARDS, len(_PAIRS), 2), dtype=np.int64)
+BEST_PAIR_RANKS = np.zeros((NUM_CARDS, len(_PAIRS)), dtype=np.int16)
+for _card in range(NUM_CARDS):
+    _ranks = FORMATION_RANKS[_card, _PAIRS[:, 0], _PAIRS[:, 1]]
+    _order = np.argsort(-_ranks, kind="stable")
+    BEST_PAIRS[_card] = _PAIRS[_order]
+    BEST_PAIR_RANKS[_card] = _ranks[_order]
+
+BEST_THIRDS = np.argsort(-FORMATION_RANKS, axis=2, kind="stable")
+BEST_THIRD_RANKS = np.take_along_axis(FORMATION_RANKS, BEST_THIRDS, axis=2)
+
+MEMO_SIZE = 100000
+_memo = {}
+
+
+def _first_rank(available, ranks):
+    idx = int(available.argmax())
+    return int(ranks[idx]) if available[idx] else 0
+
+
+def best_completion(cards, unseen):
+    # Meilleur rang atteignable en complétant `cards` avec des cartes de `unseen`
+    # (0 si la formation ne peut plus être complétée).
+    cards = tuple(sorted(cards))
+    key = (cards, unseen)
+    if key in _memo:
+        return _memo[key]
+    if len(cards) == 3:
+        best = int(FORMATION_RANKS[cards])
+    else:
+        pool = np.zeros(NUM_CARDS, dtype=bool)
+        pool[list(unseen)] = True
+        if len(cards) == 2:
+            a, b = cards
+            best = _first_rank(pool[BEST_THIRDS[a, b]], BEST_THIRD_RANKS[a, b])
+        elif len(cards) == 1:
+            pairs = BEST_PAIRS[cards[0]]
+            best = _first_rank(pool[pairs[:, 0]] & pool[pairs[:, 1]], BEST_PAIR_RANKS[cards[0]])
+        else:
+            t = BEST_TRIPLES
+            best = _first_rank(pool[t[:, 0]] & pool[t[:, 1]] & pool[t[:, 2]], BEST_TRIPLE_RANKS)
+    if len(_memo) >= MEMO_SIZE:
+        _memo.clear()
+    _memo[key] = best
+    return best
+
+
+def prove_flag(player_cards, opponent_cards, unseen):
+    # Renvoie le camp dont la formation complète ne peut plus être battue, sinon None.
+    # `unseen` : cartes encore hors des drapeaux (pioche et mains), en frozenset d'identifiants.
+    for side, mine, other in (("player", player_cards, opponent_cards),
+                              ("opponent", opponent_cards, player_cards)):
+        if len(mine) == 3 and len(other) < 3:
+            if best_completion(other, unseen) < FORMATION_RANKS[tuple(mine)]:
+                return side
+    return None
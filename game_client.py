@@ -0,0 +1,79 @@
+import json
+import urllib.error
+import urllib.request
+
+from battle_line_game import Card
+
+
+class RemoteFlag:
+    def __init__(self, data):
+        self.winner = data["winner"]
+        self.slots = {p: [Card(color, value) for color, value in data[p]] for p in ("player", "opponent")}
+
+
+class RemoteState:
+    # Vue en lecture seule de l'état renvoyé par game_server, avec les attributs lus par l'interface Tk
+    def __init__(self, data):
+        self.flags = [RemoteFlag(f) for f in data["flags"]]
+        self.hands = {p: [Card(color, value) for color, value in data["hands"][p]] for p in ("player", "opponent")}
+        self.deck = [None] * data["deck_size"]
+        self.current_turn = data["current_turn"]
+        self.flag_counts = data["flag_counts"]
+        self.adjacent = data["adjacent"]
+        self.winner = data["winner"]
+
+    def has_adjacent(self, player):
+        return self.adjacent[player]
+
+    def check_game_over(self):
+        return self.winner
+
+
+class RemoteGame:
+    def __init__(self, data):
+        self.state = RemoteState(data)
+        self.remote = True
+
+
+class RemoteBattleLineEnv:
+    # Client léger : chaque coup est envoyé au serveur, qui fait aussi jouer l'IA
+    def __init__(self, url="http://127.0.0.1:8765", timeout=10.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.game_id = None
+        self.game = None
+        self.reset()
+
+    def _request(self, method, path, payload=None):
+        body = None if payload is None else json.dumps(payload).encode()
+        request = urllib.request.Request(self.url + path, data=body, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return json.loads(e.read())
+
+    def reset(self):
+        if self.game_id is not None:
+            self.close()
+        data = self._request("POST", "/games", {})
+        self.game_id = data["id"]
+        self.game = RemoteGame(data)
+        return None
+
+    def step(self, action):
+        data = self._request("POST", f"/games/{self.game_id}/move", {"card": action // 9, "flag": action % 9})
+        info = {}
+        if data.get("error"):
+            info["error"] = data["error"]
+        if "flags" in data:
+            self.game = RemoteGame(data)
+        return None, 0.0, data.get("done", False), info
+
+    def close(self):
+        try:
+            self._request("DELETE", f"/games/{self.game_id}")
+        except OSError:
+            pass
+        self.game_id = None
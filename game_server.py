@@ -0,0 +1,260 @@
+import argparse
+import itertools
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import torch
+
+from battle_line_game import BattleLineGame, encoder_for_dim
+from model_export import load_policy_model
+
+HUMAN = "player"
+AI = "opponent"
+
+
+def load_policy(path=None, prefer_export=False):
+    # Sans chemin : model/model.pth, ou son export (int8, TorchScript) avec prefer_export (model_export.find_model) ;
+    # l'encodeur d'état se déduit de la taille d'entrée du modèle
+    net, state_dim = load_policy_model(path, prefer_export)
+    return net, encoder_for_dim(state_dim).name
+
+
+class BatchedPolicy:
+    # Regroupe les demandes de coup de toutes les parties en micro-lots : un lot part dès qu'il
+    # contient max_batch demandes ou que la plus ancienne a attendu max_wait secondes.
+    def __init__(self, net, max_batch=64, max_wait=0.005, latency_window=10000):
+        self.net = net
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.latencies = []
+        self.latency_window = latency_window
+        self.batches = 0
+        self.batched_requests = 0
+        self.stats_lock = threading.Lock()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def submit(self, state, mask):
+        future = Future()
+        self.requests.put((state, mask, future, time.perf_counter()))
+        return future
+
+    def _run(self):
+        while True:
+            pending = [self.requests.get()]
+            deadline = pending[0][3] + self.max_wait
+            while len(pending) < self.max_batch:
+                # Échéance dépassée : on prend quand même tout ce qui attend déjà dans la file
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        pending.append(self.requests.get(timeout=remaining))
+                    else:
+                        pending.append(self.requests.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                states = np.stack([p[0] for p in pending])
+                masks = np.stack([p[1] for p in pending])
+                with torch.inference_mode():
+                    q_values = self.net(torch.as_tensor(states, dtype=torch.float32)).numpy()
+                actions = np.where(masks, q_values, -np.inf).argmax(axis=1)
+            except Exception as e:
+                for p in pending:
+                    p[2].set_exception(e)
+                continue
+            done = time.perf_counter()
+            for p, action in zip(pending, actions):
+                p[2].set_result(int(action))
+            with self.stats_lock:
+                self.batches += 1
+                self.batched_requests += len(pending)
+                self.latencies.extend(done - p[3] for p in pending)
+                if len(self.latencies) > self.latency_window:
+                    del self.latencies[:-self.latency_window]
+
+    def stats(self):
+        with self.stats_lock:
+            latencies = np.array(self.latencies) * 1000.0
+            batches, requests = self.batches, self.batched_requests
+        result = {"batches": batches, "mean_batch": requests / batches if batches else 0.0}
+        if len(latencies):
+            result["p50_ms"] = float(np.percentile(latencies, 50))
+            result["p99_ms"] = float(np.percentile(latencies, 99))
+        return result
+
+
+def card_json(card):
+    return [card.color, card.value]
+
+
+class GameSession:
+    # Une partie : l'humain joue "player" (en bas), le réseau joue "opponent" avec une observation
+    # vue de son côté, comme pendant l'entraînement.
+    def __init__(self, policy, encoder):
+        self.policy = policy
+        self.game = BattleLineGame(encoder=encoder)
+        self.lock = threading.Lock()
+        self.last_used = time.time()
+
+    def to_json(self, error=None):
+        state = self.game.state
+        return {
+            "flags": [{"winner": f.winner,
+                       "player": [card_json(c) for c in f.slots["player"]],
+                       "opponent": [card_json(c) for c in f.slots["opponent"]]} for f in state.flags],
+            "hands": {p: [card_json(c) for c in state.hands[p]] for p in ("player", "opponent")},
+            "deck_size": len(state.deck),
+            "current_turn": state.current_turn,
+            "flag_counts": dict(state.flag_counts),
+            "adjacent": {p: state.has_adjacent(p) for p in ("player", "opponent")},
+            "winner": state.check_game_over(),
+            "done": self.is_done(),
+            "error": error,
+        }
+
+    def is_done(self):
+        state = self.game.state
+        return (state.check_game_over() is not None
+                or not (state.available_actions(HUMAN) or state.available_actions(AI)))
+
+    def play(self, card_index, flag_index):
+        self.last_used = time.time()
+        if self.is_done():
+            return "Partie terminée"
+        if (card_index, flag_index) not in self.game.state.available_actions(HUMAN):
+            return "Mouvement invalide"
+        self.game.step(HUMAN, card_index, flag_index)
+        if self.game.state.check_game_over() is None:
+            mask = self.game.get_action_mask_for(AI)
+            if mask.any():
+                state = self.game.get_state_vector_for(AI)
+                action = self.policy.submit(state, mask).result()
+                self.game.step(AI, *self.game.decode_action(action))
+        return None
+
+
+class GameServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, policy, encoder, session_timeout=3600.0):
+        super().__init__(address, GameRequestHandler)
+        self.policy = policy
+        self.encoder = encoder
+        self.session_timeout = session_timeout
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def new_session(self):
+        session = GameSession(self.policy, self.encoder)
+        with self.sessions_lock:
+            now = time.time()
+            for key in [k for k, s in self.sessions.items() if now - s.last_used > self.session_timeout]:
+                del self.sessions[key]
+            game_id = str(next(self.ids))
+            self.sessions[game_id] = session
+        return game_id, session
+
+
+class GameRequestHandler(BaseHTTPRequestHandler):
+    # POST /games                  -> nouvelle partie
+    # GET  /games/<id>             -> état de la partie
+    # POST /games/<id>/move        -> {"card": i, "flag": j} puis réponse de l'IA
+    # DELETE /games/<id>           -> fin de session
+    # GET  /stats                  -> sessions et latences de l'inférence par lots
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _session(self, game_id):
+        with self.server.sessions_lock:
+            return self.server.sessions.get(game_id)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts == ["stats"]:
+            with self.server.sessions_lock:
+                sessions = len(self.server.sessions)
+            return self._send(200, {"sessions": sessions, **self.server.policy.stats()})
+        if len(parts) == 2 and parts[0] == "games":
+            session = self._session(parts[1])
+            if session is None:
+                return self._send(404, {"error": "Partie inconnue"})
+            with session.lock:
+                return self._send(200, session.to_json())
+        self._send(404, {"error": "Chemin inconnu"})
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        if parts == ["games"]:
+            self._read_json()
+            game_id, session = self.server.new_session()
+            with session.lock:
+                return self._send(200, {"id": game_id, **session.to_json()})
+        if len(parts) == 3 and parts[0] == "games" and parts[2] == "move":
+            session = self._session(parts[1])
+            if session is None:
+                return self._send(404, {"error": "Partie inconnue"})
+            try:
+                move = self._read_json()
+                card_index, flag_index = int(move["card"]), int(move["flag"])
+            except (KeyError, TypeError, ValueError):
+                return self._send(400, {"error": "Coup mal formé"})
+            with session.lock:
+                error = session.play(card_index, flag_index)
+                return self._send(200, session.to_json(error))
+        self._send(404, {"error": "Chemin inconnu"})
+
+    def do_DELETE(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "games":
+            with self.server.sessions_lock:
+                self.server.sessions.pop(parts[1], None)
+            return self._send(200, {})
+        self._send(404, {"error": "Chemin inconnu"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur de parties Humain vs IA (inférence par lots)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--prefer-export", action="store_true", help="utilise model_int8.pt / model.pt à la place de model.pth")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    net, encoder = load_policy(args.model, args.prefer_export)
+    policy = BatchedPolicy(net, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000.0)
+    server = GameServer((args.host, args.port), policy, encoder)
+    print(f"Serveur de jeu sur http://{args.host}:{args.port} (encodeur {encoder})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import math
+import random
+import time
+
+import numpy as np
+import torch
+
+from battle_line_fast import (COUNT, DECK, DECK_SIZE, DRAW, HAND, HAND_SIZE, NO_WINNER, RESULT, SIDE_INDEX,
+                              SLOTS_PER_SIDE, TURN, WINNER, FastGameState)
+from battle_line_game import MAX_HAND_SIZE, get_encoder, state_slot_cards
+
+NUM_FLAGS = 9
+PASS = None
+
+
+class Node:
+    __slots__ = ("key", "parent", "children", "player", "visits", "wins", "avail", "prior")
+
+    def __init__(self):
+        self.children = {}
+
+
+class NodePool:
+    # Les nœuds sont réutilisés d'un coup à l'autre : reset() rend tout le pool disponible
+    def __init__(self, size=50000):
+        self.nodes = [Node() for _ in range(size)]
+        self.used = 0
+
+    def reset(self):
+        self.used = 0
+
+    def acquire(self, key, parent, player, prior=0.0):
+        if self.used == len(self.nodes):
+            self.nodes.append(Node())
+        node = self.nodes[self.used]
+        self.used += 1
+        node.key = key
+        node.parent = parent
+        node.children.clear()
+        node.player = player
+        node.visits = 0
+        node.wins = 0.0
+        node.avail = 1
+        node.prior = prior
+        return node
+
+
+def reward(result, side):
+    if result == side:
+        return 1.0
+    if result == NO_WINNER or result == DRAW:
+        return 0.5
+    return 0.0
+
+
+class ISMCTSAgent:
+    # ISMCTS à observateur unique : chaque simulation tire un ordre de pioche compatible avec ce que
+    # voit le joueur (et, si hide_opponent_hand, une main adverse), puis parcourt un arbre commun
+    # dont les coups sont identifiés par (carte, drapeau). Sélection UCB avec comptes de disponibilité.
+    # prior_model (voir model_export.load_policy_model) : Q-valeurs du DQN utilisées comme a priori
+    # à la racine et, si rollout="dqn", comme politique de simulation.
+    def __init__(self, time_budget=1.0, iterations=None, exploration=0.7, prior_model=None, encoder="full27",
+                 prior_weight=1.0, prior_temperature=1.0, rollout="random", hide_opponent_hand=False,
+                 pool_size=50000, seed=None):
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.exploration = exploration
+        self.prior_model = prior_model
+        self.encoder = get_encoder(encoder)
+        self.prior_weight = prior_weight
+        self.prior_temperature = prior_temperature
+        self.rollout_policy = rollout
+        self.hide_opponent_hand = hide_opponent_hand
+        self.pool = NodePool(pool_size)
+        self.rng = random.Random(seed)
+        self.last_iterations = 0
+        self.last_elapsed = 0.0
+
+    def __call__(self, game, player):
+        # Interface opponent_policy de BattleLineEnv : renvoie (index_carte, index_drapeau)
+        return self.choose_move(game.state, player)
+
+    def choose_move(self, state, player):
+        start = time.perf_counter()
+        me = SIDE_INDEX[player]
+        root_state = state.clone() if isinstance(state, FastGameState) else FastGameState.from_state(state)
+        root_state.buf[TURN] = me
+        legal = root_state.legal_moves(me)
+        if not legal:
+            raise ValueError(f"Aucun coup légal pour {player}")
+        if len(legal) == 1:
+            return legal[0][1], legal[0][2]
+        self.pool.reset()
+        root = self.pool.acquire(PASS, None, 1 - me)
+        priors = self._priors(root_state, me, legal) if self.prior_model is not None else {}
+
+        deadline = start + self.time_budget if self.time_budget else None
+        iterations = 0
+        while True:
+            self._iterate(root, root_state, me, priors)
+            iterations += 1
+            if self.iterations is not None and iterations >= self.iterations:
+                break
+            if deadline is not None and iterations % 16 == 0 and time.perf_counter() >= deadline:
+                break
+        self.last_iterations = iterations
+        self.last_elapsed = time.perf_counter() - start
+
+        card, flag = max(root.children.values(), key=lambda n: (n.visits, n.wins)).key
+        return root_state.hand_card_ids(me).index(card), flag
+
+    def _priors(self, state, me, legal):
+        obs = self.encoder.encode_batch(state_slot_cards(state, me)[None])
+        with torch.inference_mode():
+            q_values = self.prior_model(torch.as_tensor(obs, dtype=torch.float32))[0].numpy()
+        hand = state.hand_card_ids(me)
+        keys = [(hand[c], f) for _, c, f in legal]
+        q = np.array([q_values[c * NUM_FLAGS + f] for _, c, f in legal], dtype=np.float64) / self.prior_temperature
+        p = np.exp(q - q.max())
+        p /= p.sum()
+        return dict(zip(keys, p.tolist()))
+
+    def _determinize(self, state, me):
+        buf = state.buf
+        deck_size = buf[DECK_SIZE]
+        hidden = buf[DECK:DECK + deck_size].tolist()
+        opp = HAND + (1 - me) * MAX_HAND_SIZE
+        opp_size = buf[HAND_SIZE + 1 - me]
+        if self.hide_opponent_hand:
+            hidden += buf[opp:opp + opp_size].tolist()
+        self.rng.shuffle(hidden)
+        for i in range(deck_size):
+            buf[DECK + i] = hidden[i]
+        if self.hide_opponent_hand:
+            for i in range(opp_size):
+                buf[opp + i] = hidden[deck_size + i]
+
+    def _moves(self, state, side):
+        # Coups indexés par (carte, drapeau) : l'index dans la main dépend de la déterminisation
+        hand = state.hand_card_ids(side)
+        return {(hand[c], f): (s, c, f) for s, c, f in state.legal_moves(side)}
+
+    def _iterate(self, root, root_state, me, priors):
+        state = root_state.clone()
+        self._determinize(state, me)
+        buf = state.buf
+        node = root
+        expanded = False
+        while buf[RESULT] == NO_WINNER and not expanded:
+            side = buf[TURN]
+            moves = self._moves(state, side)
+            if not moves:
+                if not state.legal_moves(1 - side):
+                    break
+                moves = {PASS: None}
+            children = node.children
+            untried = []
+            for key in moves:
+                child = children.get(key)
+                if child is None:
+                    untried.append(key)
+                else:
+                    child.avail += 1
+            if untried:
+                if node is root and priors:
+                    key = max(untried, key=lambda k: priors.get(k, 0.0))
+                else:
+                    key = untried[self.rng.randrange(len(untried))]
+                child = self.pool.acquire(key, node, side, priors.get(key, 0.0) if node is root else 0.0)
+                children[key] = child
+                expanded = True
+            else:
+                child = self._select(children, moves)
+            self._play(state, side, moves[child.key])
+            node = child
+        result = self._rollout(state)
+        while node is not None:
+            node.visits += 1
+            node.wins += reward(result, node.player)
+            node = node.parent
+
+    def _select(self, children, moves):
+        best, best_score = None, -math.inf
+        c = self.exploration
+        w = self.prior_weight
+        for key in moves:
+            child = children[key]
+            score = (child.wins / child.visits + c * math.sqrt(math.log(child.avail) / child.visits)
+                     + w * child.prior / (1 + child.visits))
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+    def _play(self, state, side, move):
+        if move is None:
+            state.buf[TURN] = 1 - side
+        else:
+            state.apply(move)
+
+    def _rollout(self, state):
+        if self.rollout_policy == "dqn":
+            return self._dqn_rollout(state)
+        # Coup uniforme parmi (carte, drapeau ouvert) = carte uniforme puis drapeau ouvert uniforme :
+        # pas besoin de construire la liste des coups légaux à chaque pli
+        buf = state.buf
+        random_ = self.rng.random
+        while buf[RESULT] == NO_WINNER:
+            side = buf[TURN]
+            size = buf[HAND_SIZE + side]
+            open_flags = [fi for fi in range(NUM_FLAGS)
+                          if buf[WINNER + fi] == NO_WINNER and buf[COUNT + fi * 2 + side] < SLOTS_PER_SIDE] if size else ()
+            if not open_flags:
+                if not state.legal_moves(1 - side):
+                    break
+                buf[TURN] = 1 - side
+                continue
+            state.apply((side, int(random_() * size), open_flags[int(random_() * len(open_flags))]))
+        return buf[RESULT]
+
+    def _dqn_rollout(self, state):
+        buf = state.buf
+        while buf[RESULT] == NO_WINNER:
+            side = buf[TURN]
+            legal = state.legal_moves(side)
+            if not legal:
+                if not state.legal_moves(1 - side):
+                    break
+                buf[TURN] = 1 - side
+                continue
+            state.apply(self._dqn_move(state, side, legal))
+        return buf[RESULT]
+
+    def _dqn_move(self, state, side, legal):
+        obs = self.encoder.encode_batch(state_slot_cards(state, side)[None])
+        with torch.inference_mode():
+            q_values = self.prior_model(torch.as_tensor(obs, dtype=torch.float32))[0]
+        return max(legal, key=lambda m: float(q_values[m[1] * NUM_FLAGS + m[2]]))
@@ -1,24 +1,57 @@
-from matplotlib import pyplot as plt
+import argparse
+import copy
+import random
+import time
 import numpy as np
+import torch
 from battle_line_env import BattleLineEnv
+from checkpoint import CheckpointWriter, capture_rng, load_checkpoint, restore_rng
 from dqn_agent import DQNAgent
+from n_step import NStepAccumulator
+from profiler import NULL_PROFILER, PhaseProfiler, StackSampler, write_json_line
 
-DIM_ETAT = 1836
 DIM_ACTION = 63
+CHEMIN_CHECKPOINT = "checkpoints/entrainement.pt"
+DOSSIER_PROFIL = "profils"
+HYPERPARAMETRES = {"lr": 1e-5, "gamma": 0.99, "epsilon": 1.0, "epsilon_min": 0.05, "epsilon_decay": 0.995,
+                   "batch_size": 64, "tau": 0.005}
 
-def entrainer_agent(episodes=1000):
-    env = BattleLineEnv(opponent_policy="random")
+def entrainer_agent(episodes=1000, acteurs=0, n_pas=1, chemin_rejeu=None, apprendre_tous_les=1, pas_gradient=1,
+                    encodeur="full27", chemin_checkpoint=CHEMIN_CHECKPOINT, checkpoint_tous_les=100, reprendre=False,
+                    profiler=False, episodes_echantillonnes=(), dossier_profil=DOSSIER_PROFIL, hyperparametres=None,
+                    graine=None, journal=None, dossier_modele="./model", verbeux=True):
+    # hyperparametres : surcharge de HYPERPARAMETRES ; journal : MetricsWriter (une ligne JSON par épisode)
+    hyperparametres = {**HYPERPARAMETRES, **(hyperparametres or {})}
+    if graine is not None:
+        random.seed(graine)
+        np.random.seed(graine)
+        torch.manual_seed(graine)
+    if acteurs > 0:
+        # Le mode parallèle n'écrit pas de point de reprise et n'a pas de profileur
+        if reprendre or profiler or episodes_echantillonnes:
+            raise ValueError("Reprise et profilage non disponibles avec acteurs > 0")
+        from actor_learner import entrainer_parallele
+        return entrainer_parallele(episodes=episodes, acteurs=acteurs, encoder=encodeur, action_dim=DIM_ACTION, n_pas=n_pas,
+                                   seed=graine or 0, update_every=apprendre_tous_les, gradient_steps=pas_gradient,
+                                   replay_path=chemin_rejeu, memory_capacity=100000 if chemin_rejeu is None else 10000000,
+                                   dossier_modele=dossier_modele, journal=journal, **hyperparametres)
+    env = BattleLineEnv(opponent_policy="random", encoder=encodeur)
     agent = DQNAgent(
-        state_dim=DIM_ETAT,
+        state_dim=env.state_dim,
         action_dim=DIM_ACTION,
-        lr=1e-5,
-        gamma=0.99,
-        epsilon=1.0,
-        epsilon_min=0.05,
-        epsilon_decay=0.995,
-        batch_size=64,
-        tau=0.005
+        replay_path=chemin_rejeu,
+        memory_capacity=100000 if chemin_rejeu is None else 10000000,
+        update_every=apprendre_tous_les,
+        gradient_steps=pas_gradient,
+        **hyperparametres
     )
+    accumulateur = NStepAccumulator(n_pas, agent.gamma)
+    # profiler : temps par phase, résumé JSON tous les 50 épisodes et en fin d'entraînement ;
+    # episodes_echantillonnes : numéros d'épisodes passés au profileur par échantillonnage
+    profileur = PhaseProfiler() if profiler else NULL_PROFILER
+    env.profiler = agent.profiler = profileur
+    phase_reset, phase_choix, phase_pas, phase_stockage, phase_maj = (
+        profileur.phase(nom) for nom in ("reset", "select_action", "step", "store", "update"))
     victoires = 0
     recompense_totale = 0.0
     stats = {
@@ -27,40 +60,94 @@ def entrainer_agent(episodes=1000):
         "taux_victoire": [],
         "epsilons": []
     }
-    for ep in range(episodes):
-        etat = env.reset()
+    debut = 0
+    if reprendre:
+        # Reprise à l'identique : l'état des générateurs aléatoires est restauré en dernier,
+        # après toutes les constructions qui en consomment
+        checkpoint = load_checkpoint(chemin_checkpoint)
+        agent.load_state_dict(checkpoint["agent"])
+        debut = checkpoint["episode"]
+        victoires, recompense_totale = checkpoint["victoires"], checkpoint["recompense_totale"]
+        stats = checkpoint["stats"]
+        restore_rng(checkpoint["rng"])
+        print(f"Reprise à l'épisode {debut} depuis {chemin_checkpoint}")
+    ecrivain = CheckpointWriter(chemin_checkpoint) if checkpoint_tous_les else None
+    for ep in range(debut, episodes):
+        echantillonneur = StackSampler().start() if ep + 1 in episodes_echantillonnes else None
+        debut_ep = time.perf_counter()
+        with phase_reset:
+            etat = env.reset()
         termine = False
         recompense_ep = 0.0
+        pas = 0
+        pertes = []
         while not termine:
-            actions_valides = env.get_valid_actions()
-            if not actions_valides:
+            masque = env.get_action_mask()
+            if not masque.any():
                 gagnant = env.game.state.check_game_over()
                 recompense_finale = 100.0 if gagnant == "player" else -100.0 if gagnant == "opponent" else 0.0
-                agent.store_transition(etat, 0, recompense_finale, etat, True)
+                with phase_stockage:
+                    for transition in accumulateur.push(etat, 0, recompense_finale, etat, True):
+                        agent.store_transition(*transition)
                 recompense_ep += recompense_finale
                 termine = True
                 break
-            action = agent.select_action(etat, actions_valides)
-            etat_suivant, recompense, termine, info = env.step(action)
-            agent.store_transition(etat, action, recompense, etat_suivant, termine)
-            agent.update()
+            with phase_choix:
+                action = agent.select_action(etat, masque)
+            with phase_pas:
+                etat_suivant, recompense, termine, info = env.step(action)
+            with phase_stockage:
+                for transition in accumulateur.push(etat, action, recompense, etat_suivant, termine):
+                    agent.store_transition(*transition)
+            with phase_maj:
+                perte = agent.update()
+            if perte is not None:
+                pertes.append(perte)
             etat = etat_suivant
             recompense_ep += recompense
+            pas += 1
+        if echantillonneur is not None:
+            echantillonneur.stop()
+            echantillonneur.write_collapsed(f"{dossier_profil}/episode_{ep + 1}.collapsed")
+            write_json_line(f"{dossier_profil}/echantillons.jsonl", {"episode": ep + 1, **echantillonneur.summary()})
         gagnant = env.game.state.check_game_over()
         if gagnant == "player":
             victoires += 1
         recompense_totale += recompense_ep
+        if journal is not None:
+            duree = time.perf_counter() - debut_ep
+            journal.log({"type": "episode", "episode": ep + 1, "reward": recompense_ep, "winner": gagnant,
+                         "steps": pas, "epsilon": agent.epsilon, "loss": sum(pertes) / len(pertes) if pertes else None,
+                         "steps_per_second": pas / duree if duree else 0.0, "time": time.time()})
         if (ep + 1) % 50 == 0:
             taux_victoire_moyen = victoires / 50
             recompense_moyenne = recompense_totale / 50
-            print(f"Épisode {ep + 1}/{episodes} | Taux de victoire : {taux_victoire_moyen:.2f} | Epsilon : {agent.epsilon:.2f} | Récompense moyenne : {recompense_moyenne:.2f}")
+            if journal is not None:
+                journal.log({"type": "window", "episode": ep + 1, "win_rate": taux_victoire_moyen,
+                             "mean_reward": recompense_moyenne, "epsilon": agent.epsilon})
+            if verbeux:
+                print(f"Épisode {ep + 1}/{episodes} | Taux de victoire : {taux_victoire_moyen:.2f} | Epsilon : {agent.epsilon:.2f} | Récompense moyenne : {recompense_moyenne:.2f}")
             stats["episodes"].append(ep + 1)
             stats["taux_victoire"].append(taux_victoire_moyen)
             stats["recompenses_moyennes"].append(recompense_moyenne)
             stats["epsilons"].append(agent.epsilon)
             victoires = 0
             recompense_totale = 0.0
-    agent.policy_net.save()
+            if profileur.enabled:
+                write_json_line(f"{dossier_profil}/phases.jsonl", {"episode": ep + 1, **profileur.summary(interval=True)})
+        if ecrivain is not None and (ep + 1) % checkpoint_tous_les == 0:
+            ecrivain.submit({"agent": agent.state_dict(), "episode": ep + 1, "victoires": victoires,
+                             "recompense_totale": recompense_totale, "stats": copy.deepcopy(stats),
+                             "rng": capture_rng()})
+    if ecrivain is not None:
+        ecrivain.close()
+    if profileur.enabled:
+        resume = profileur.summary()
+        write_json_line(f"{dossier_profil}/phases.jsonl", {"episode": episodes, "final": True, **resume})
+        profileur.print_summary(resume)
+    agent.policy_net.save(model_folder_path=dossier_modele)
+    if chemin_rejeu is not None:
+        agent.memory.flush()
     return stats
 
 def jouer_partie():
@@ -90,25 +177,28 @@ def jouer_partie():
         print("Égalité !")
 
 if __name__ == "__main__":
-    mode = input("Entrez le mode (entrainer/jouer) : ").strip().lower()
-    if mode == "entrainer":
-        stats = entrainer_agent(episodes=1000)
-        plt.figure(figsize=(12, 5))
-        plt.subplot(1, 2, 1)
-        plt.plot(stats["episodes"], stats["taux_victoire"], marker='o')
-        plt.title("Taux de Victoire")
-        plt.xlabel("Épisodes")
-        plt.ylabel("Taux de Victoire")
-        plt.grid(True)
-        plt.subplot(1, 2, 2)
-        plt.plot(stats["episodes"], stats["recompenses_moyennes"], marker='o', color="orange")
-        plt.title("Récompense Moyenne")
-        plt.xlabel("Épisodes")
-        plt.ylabel("Récompense Moyenne")
-        plt.grid(True)
-        plt.tight_layout()
-        plt.show()
+    # python main.py --resume [chemin] : reprend l'entraînement depuis le dernier point de reprise
+    # --profile : temps par phase dans profils/phases.jsonl ; --profile-episodes 10,500 : échantillonnage de ces épisodes
+    parser = argparse.ArgumentParser(description="Entraînement interactif du DQN ou partie de démonstration")
+    parser.add_argument("--resume", nargs="?", const=CHEMIN_CHECKPOINT, default=None, metavar="CHEMIN")
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--profile-episodes", default="")
+    args = parser.parse_args()
+    reprendre = args.resume is not None
+    profiler = args.profile
+    episodes_echantillonnes = {int(e) for e in args.profile_episodes.split(",") if e}
+    mode = "entrainer" if reprendre else input("Entrez le mode (entrainer/entrainer_parallele/jouer) : ").strip().lower()
+    if mode in ("entrainer", "entrainer_parallele"):
+        acteurs = 0
+        if mode == "entrainer_parallele":
+            acteurs = int(input("Nombre de processus acteurs : ").strip() or 4)
+        chemin = args.resume or CHEMIN_CHECKPOINT
+        stats = entrainer_agent(episodes=1000, acteurs=acteurs, chemin_checkpoint=chemin, reprendre=reprendre,
+                                profiler=profiler, episodes_echantillonnes=episodes_echantillonnes)
+        # Entraînement sans interface : train.py ; tracés hors ligne d'un journal : plot_metrics.py
+        from plot_metrics import tracer_stats
+        tracer_stats(stats)
     elif mode == "jouer":
         jouer_partie()
     else:
-        print("Mode inconnu. Choisissez 'entrainer' ou 'jouer'.")
\ No newline at end of file
+        print("Mode inconnu. Choisissez 'entrainer', 'entrainer_parallele' ou 'jouer'.")
\ No newline at end of file
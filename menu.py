@@ -1,18 +1,17 @@
+import time
 import tkinter as tk
-import subprocess
-import sys
-import os
 
 class GameMenu:
+    # Menu et parties tournent dans la même fenêtre : chaque mode est construit dans un cadre détruit au
+    # retour au menu ; images (asset_cache), modèle et sons restent chargés d'une partie à l'autre
     def __init__(self, root):
         self.root = root
-        self.root.title("Sélection du mode de jeu")
-        self.root.geometry("1000x700")
         self.root.configure(bg="#2c3e50")
+        self.game_frame = None
+        self.game = None
 
         # Cadre du menu
         self.menu_frame = tk.Frame(root, bg="#34495e", padx=130, pady=100)
-        self.menu_frame.place(relx=0.5, rely=0.5, anchor="center")
 
         # Titre
         tk.Label(self.menu_frame, text="Battle Line", font=("Arial", 24, "bold"),
@@ -38,25 +37,48 @@ class GameMenu:
         tk.Button(self.menu_frame, text="Humain vs IA",
                   command=self.launch_humain_vs_ia, **button_style).pack(pady=5)
 
+        tk.Button(self.menu_frame, text="Humain vs ISMCTS",
+                  command=self.launch_humain_vs_ismcts, **button_style).pack(pady=5)
+
         tk.Button(self.menu_frame, text="Aléatoire vs Aléatoire",
                   command=self.launch_aleatoire_vs_aleatoire, **button_style).pack(pady=5)
 
+        self.show_menu()
+
+    def show_menu(self):
+        if self.game_frame is not None:
+            self.game_frame.destroy()
+            self.game_frame = self.game = None
+        self.root.title("Sélection du mode de jeu")
+        self.root.geometry("1000x700")
+        self.menu_frame.place(relx=0.5, rely=0.5, anchor="center")
+
+    def launch(self, interface, **kwargs):
+        self.menu_frame.place_forget()
+        # Taille naturelle du contenu, sauf si l'interface impose la sienne
+        self.root.geometry("")
+        self.game_frame = tk.Frame(self.root)
+        self.game_frame.pack(fill="both", expand=True)
+        self.game = interface(self.game_frame, on_menu=self.show_menu, **kwargs)
+
+    def launch_game_interface(self, mode):
+        started = time.perf_counter()
+        from HumainVS_IA import GameInterface
+        self.launch(GameInterface, mode=mode, started=started)
+
     def launch_humain_vs_ia(self):
-        self.launch_script("HumainVS_IA.py")
+        self.launch_game_interface("Humain vs IA")
+
+    def launch_humain_vs_ismcts(self):
+        self.launch_game_interface("Humain vs ISMCTS")
 
     def launch_humain_vs_humain(self):
-        self.launch_script("agent_human.py")
+        from agent_human import HumanVsHuman
+        self.launch(HumanVsHuman)
 
     def launch_aleatoire_vs_aleatoire(self):
-        self.launch_script("agent_aleatoire.py")
-
-    def launch_script(self, filename):
-        script_path = os.path.join(os.path.dirname(__file__), filename)
-        if os.path.exists(script_path):
-            subprocess.Popen([sys.executable, script_path])
-            self.root.destroy()
-        else:
-            print(f"Le fichier {filename} n'existe pas.")
+        from agent_aleatoire import BattleLineAutoInterface
+        self.launch(BattleLineAutoInterface)
 
 def main():
     root = tk.Tk()
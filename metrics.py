@@ -0,0 +1,42 @@
+import json
+import os
+import queue
+import threading
+
+
+class MetricsWriter:
+    # Journal JSONL écrit par un fil d'arrière-plan : log() ne fait qu'empiler le dictionnaire.
+    # Chaque lot d'enregistrements est vidé sur disque, le fichier peut donc être suivi pendant l'entraînement.
+    def __init__(self, path, append=False):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(path, "a" if append else "w")
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def log(self, record):
+        self.queue.put(record)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            while record is not None:
+                self.file.write(json.dumps(record) + "\n")
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.file.flush()
+            if record is None:
+                return
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+
+
+def read_metrics(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,180 @@
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from dqn_agent import DQN
+
+ACTION_DIM = 63
+MODEL_DIR = "model"
+MODEL_FILE = "model.pth"
+# Exports (model_export.py), par ordre de préférence, utilisés à la place de model.pth seulement sur demande
+EXPORT_CANDIDATES = ("model_int8.pt", "model.pt")
+
+
+def load_eager(path):
+    state_dict = torch.load(path, map_location=torch.device('cpu'))
+    net = DQN(state_dict["net.0.weight"].shape[0], ACTION_DIM)
+    net.load_state_dict(state_dict)
+    net.eval()
+    return net
+
+
+def strip_dropout(net):
+    # En inférence, Dropout est l'identité : on l'enlève du graphe exporté
+    return nn.Sequential(*[m for m in net.net if not isinstance(m, nn.Dropout)]).eval()
+
+
+def quantize_int8(module):
+    return torch.ao.quantization.quantize_dynamic(module, {nn.Linear}, dtype=torch.qint8)
+
+
+def export_torchscript(module, state_dim, path):
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.script(module).eval())
+    torch.jit.save(scripted, path, _extra_files={"state_dim": str(state_dim)})
+    return path
+
+
+def export_onnx(module, state_dim, path):
+    # Dépendance optionnelle : l'exporteur ONNX de PyTorch requiert les paquets onnx et onnxscript
+    try:
+        torch.onnx.export(module, torch.zeros(1, state_dim), path, input_names=["state"], output_names=["q_values"],
+                          dynamic_axes={"state": {0: "batch"}, "q_values": {0: "batch"}})
+    except ImportError as e:
+        print(f"Export ONNX ignoré : {e}")
+        return None
+    return path
+
+
+class OnnxPolicy:
+    def __init__(self, path):
+        import onnxruntime
+        self.session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self.state_dim = self.session.get_inputs()[0].shape[1]
+
+    def __call__(self, states):
+        q_values = self.session.run(None, {"state": states.numpy().astype(np.float32)})[0]
+        return torch.from_numpy(q_values)
+
+    def eval(self):
+        return self
+
+
+def find_model(model_dir=MODEL_DIR, prefer_export=False):
+    # model.pth (fp32) par défaut ; les exports (int8 avec perte de précision) seulement avec prefer_export
+    if prefer_export:
+        for name in EXPORT_CANDIDATES:
+            path = os.path.join(model_dir, name)
+            if os.path.exists(path):
+                return path
+    base = os.path.join(model_dir, MODEL_FILE)
+    if os.path.exists(base):
+        return base
+    raise FileNotFoundError(f"Aucun modèle trouvé dans {model_dir}")
+
+
+def load_policy_model(path=None, prefer_export=False):
+    # Renvoie (module appelable sur un lot d'états, dimension d'état) ; le format suit l'extension :
+    # .pth (state_dict du DQN), .pt (TorchScript figé, fp32 ou int8), .onnx (onnxruntime)
+    if path is None:
+        path = find_model(prefer_export=prefer_export)
+    if path.endswith(".onnx"):
+        policy = OnnxPolicy(path)
+        return policy, policy.state_dim
+    if path.endswith(".pt"):
+        extra = {"state_dim": ""}
+        policy = torch.jit.load(path, map_location="cpu", _extra_files=extra)
+        return policy, int(extra["state_dim"])
+    net = load_eager(path)
+    return net, net.net[0].normalized_shape[0]
+
+
+def sample_states(encoder, n=2000, seed=0):
+    # États et masques rencontrés en jeu (parties aléatoires), pour mesurer l'accord des variantes
+    from battle_line_env import BattleLineEnv
+    random.seed(seed)
+    env = BattleLineEnv(encoder=encoder)
+    states, masks = [], []
+    env.reset()
+    while len(states) < n:
+        mask = env.get_action_mask()
+        if not mask.any():
+            env.reset()
+            continue
+        states.append(env.game.get_state_vector())
+        masks.append(mask)
+        _, _, done, _ = env.step(int(random.choice(np.flatnonzero(mask))))
+        if done:
+            env.reset()
+    return torch.as_tensor(np.array(states), dtype=torch.float32), torch.as_tensor(np.array(masks))
+
+
+def masked_actions(module, states, masks):
+    with torch.inference_mode():
+        return torch.where(masks, module(states), -torch.inf).argmax(dim=1)
+
+
+def latency_us(module, states, repeats=500):
+    with torch.inference_mode():
+        for i in range(20):
+            module(states[i:i + 1])
+        start = time.perf_counter()
+        for i in range(repeats):
+            module(states[i % len(states)].unsqueeze(0))
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+def report(reference, variants, states, masks):
+    reference_actions = masked_actions(reference, states, masks)
+    reference_us = latency_us(reference, states)
+    rows = [{"variante": "fp32 eager", "accord_top1": 1.0, "us_par_coup": reference_us}]
+    for name, module in variants.items():
+        agreement = float((masked_actions(module, states, masks) == reference_actions).float().mean())
+        rows.append({"variante": name, "accord_top1": agreement, "us_par_coup": latency_us(module, states)})
+    print(f"{'Variante':<16} {'Accord top-1':>13} {'µs/coup':>10} {'Accélération':>13}")
+    for row in rows:
+        print(f"{row['variante']:<16} {row['accord_top1']:>13.4f} {row['us_par_coup']:>10.1f} "
+              f"{reference_us / row['us_par_coup']:>12.2f}x")
+    return rows
+
+
+def main():
+    from battle_line_game import encoder_for_dim
+    parser = argparse.ArgumentParser(description="Export TorchScript/ONNX et quantification int8 du DQN")
+    parser.add_argument("--model", default=os.path.join(MODEL_DIR, "model.pth"))
+    parser.add_argument("--out", default=MODEL_DIR)
+    parser.add_argument("--onnx", action="store_true", help="écrit aussi model.onnx (nécessite onnx et onnxscript)")
+    parser.add_argument("--report", action="store_true", help="compare accord top-1 et latence au modèle fp32")
+    parser.add_argument("--states", type=int, default=2000)
+    args = parser.parse_args()
+
+    torch.set_num_threads(1)
+    net = load_eager(args.model)
+    state_dim = net.net[0].normalized_shape[0]
+    frozen = strip_dropout(net)
+    quantized = quantize_int8(frozen)
+    os.makedirs(args.out, exist_ok=True)
+    paths = {
+        "torchscript fp32": export_torchscript(frozen, state_dim, os.path.join(args.out, "model.pt")),
+        "torchscript int8": export_torchscript(quantized, state_dim, os.path.join(args.out, "model_int8.pt")),
+    }
+    if args.onnx:
+        paths["onnx fp32"] = export_onnx(frozen, state_dim, os.path.join(args.out, "model.onnx"))
+    for name, path in paths.items():
+        if path is not None:
+            print(f"{name} : {path}")
+
+    if args.report:
+        states, masks = sample_states(encoder_for_dim(state_dim).name, args.states)
+        variants = {"eager int8": quantized}
+        variants.update({name: load_policy_model(path)[0] for name, path in paths.items() if path is not None})
+        report(net, variants, states, masks)
+
+
+if __name__ == "__main__":
+    main()
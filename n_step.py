@@ -0,0 +1,55 @@
+from collections import deque
+
+
+class NStepAccumulator:
+    # Transforme les transitions à 1 pas en transitions à n pas :
+    # (s_t, a_t, r_t + γ r_{t+1} + ... + γ^{k-1} r_{t+k-1}, s_{t+k}, done, γ^k)
+    # avec k = n en cours d'épisode et k < n pour les dernières transitions d'un épisode.
+    def __init__(self, n=3, gamma=0.99, num_envs=1):
+        self.n = n
+        self.gamma = gamma
+        self.queues = [deque() for _ in range(num_envs)]
+
+    def _emit(self, queue, next_state, done):
+        ret = 0.0
+        for k, (_, _, reward) in enumerate(queue):
+            ret += (self.gamma ** k) * reward
+        state, action, _ = queue[0]
+        return state, action, ret, next_state, done, self.gamma ** len(queue)
+
+    def push(self, state, action, reward, next_state, done, env_id=0):
+        queue = self.queues[env_id]
+        queue.append((state, action, reward))
+        transitions = []
+        if done:
+            while queue:
+                transitions.append(self._emit(queue, next_state, True))
+                queue.popleft()
+        elif len(queue) == self.n:
+            transitions.append(self._emit(queue, next_state, False))
+            queue.popleft()
+        return transitions
+
+    def push_batch(self, states, actions, rewards, next_states, dones, info=None):
+        # Pour VecBattleLineEnv : les parties terminées sont déjà relancées, leur état suivant
+        # est l'observation finale fournie dans info
+        if info is not None and len(info["final_rows"]):
+            next_states = next_states.copy()
+            next_states[info["final_rows"]] = info["final_obs"]
+        transitions = []
+        for i in range(len(states)):
+            transitions.extend(self.push(states[i], actions[i], rewards[i], next_states[i], bool(dones[i]), env_id=i))
+        return transitions
+
+    def flush(self, next_state, env_id=0):
+        # Épisode interrompu sans fin de partie : on émet ce qui reste en amorçant sur next_state
+        queue = self.queues[env_id]
+        transitions = []
+        while queue:
+            transitions.append(self._emit(queue, next_state, False))
+            queue.popleft()
+        return transitions
+
+    def reset(self):
+        for queue in self.queues:
+            queue.clear()
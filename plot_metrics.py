@@ -0,0 +1,70 @@
+import argparse
+
+from matplotlib import pyplot as plt
+
+from metrics import read_metrics
+
+
+def tracer_stats(stats, fichier=None):
+    # stats : dictionnaire renvoyé par main.entrainer_agent
+    plt.figure(figsize=(12, 5))
+    plt.subplot(1, 2, 1)
+    plt.plot(stats["episodes"], stats["taux_victoire"], marker='o')
+    plt.title("Taux de Victoire")
+    plt.xlabel("Épisodes")
+    plt.ylabel("Taux de Victoire")
+    plt.grid(True)
+    plt.subplot(1, 2, 2)
+    plt.plot(stats["episodes"], stats["recompenses_moyennes"], marker='o', color="orange")
+    plt.title("Récompense Moyenne")
+    plt.xlabel("Épisodes")
+    plt.ylabel("Récompense Moyenne")
+    plt.grid(True)
+    plt.tight_layout()
+    afficher(fichier)
+
+
+def tracer_journal(enregistrements, fichier=None):
+    # enregistrements : lignes du journal metrics.jsonl écrit par train.py
+    fenetres = [r for r in enregistrements if r["type"] == "window"]
+    # Entraînement parallèle : perte et vitesse viennent des lignes "report" de l'apprenant
+    episodes = [r for r in enregistrements if r["type"] in ("episode", "report")]
+    pertes = [r for r in episodes if r["loss"] is not None]
+    courbes = [
+        ("Taux de Victoire", [r["episode"] for r in fenetres], [r["win_rate"] for r in fenetres], None),
+        ("Récompense Moyenne", [r["episode"] for r in fenetres], [r["mean_reward"] for r in fenetres], "orange"),
+        ("Perte Moyenne", [r["episode"] for r in pertes], [r["loss"] for r in pertes], "red"),
+        ("Pas par Seconde", [r["episode"] for r in episodes], [r["steps_per_second"] for r in episodes], "green"),
+    ]
+    plt.figure(figsize=(12, 8))
+    for i, (titre, x, y, couleur) in enumerate(courbes):
+        plt.subplot(2, 2, i + 1)
+        plt.plot(x, y, marker='o' if len(x) < 100 else None, color=couleur)
+        plt.title(titre)
+        plt.xlabel("Épisodes")
+        plt.ylabel(titre)
+        plt.grid(True)
+    plt.tight_layout()
+    afficher(fichier)
+
+
+def afficher(fichier):
+    if fichier:
+        plt.savefig(fichier)
+        print(f"Figure enregistrée : {fichier}")
+    else:
+        plt.show()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tracés hors ligne d'un journal d'entraînement (metrics.jsonl)")
+    parser.add_argument("journal")
+    parser.add_argument("--out", default=None, help="enregistre la figure dans ce fichier au lieu de l'afficher")
+    args = parser.parse_args()
+    if args.out:
+        plt.switch_backend("Agg")
+    tracer_journal(read_metrics(args.journal), args.out)
+
+
+if __name__ == "__main__":
+    main()
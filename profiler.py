@@ -0,0 +1,165 @@
+import collections
+import json
+import os
+import sys
+import threading
+import time
+
+clock = time.perf_counter
+
+
+class Phase:
+    # Gestionnaire de contexte réutilisable : deux lectures d'horloge et deux additions par passage
+    __slots__ = ("name", "total", "calls", "start")
+
+    def __init__(self, name):
+        self.name = name
+        self.total = 0.0
+        self.calls = 0
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = clock()
+        return self
+
+    def __exit__(self, *exc):
+        self.total += clock() - self.start
+        self.calls += 1
+
+
+class NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_PHASE = NullPhase()
+
+
+class NullProfiler:
+    # Profileur par défaut de BattleLineEnv et DQNAgent : phases sans effet
+    enabled = False
+
+    def phase(self, name):
+        return NULL_PHASE
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class PhaseProfiler:
+    # Temps mural et nombre d'appels cumulés par phase. Les phases peuvent s'imbriquer
+    # ("update" contient "update.sample", "update.backward"...) : les parts ne s'additionnent donc pas.
+    enabled = True
+
+    def __init__(self):
+        self.phases = {}
+        self.started = clock()
+        self.marks = {}
+        self.marked = self.started
+
+    def phase(self, name):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = Phase(name)
+        return phase
+
+    def summary(self, interval=False):
+        # interval=True : seulement ce qui s'est passé depuis le précédent résumé par intervalle
+        now = clock()
+        since = self.marked if interval else self.started
+        elapsed = now - since
+        phases = {}
+        for name, phase in self.phases.items():
+            total, calls = phase.total, phase.calls
+            if interval:
+                total_before, calls_before = self.marks.get(name, (0.0, 0))
+                total, calls = total - total_before, calls - calls_before
+            if calls:
+                phases[name] = {"seconds": total, "calls": calls, "mean_us": total / calls * 1e6,
+                                "share": total / elapsed if elapsed else 0.0}
+        if interval:
+            self.marks = {name: (p.total, p.calls) for name, p in self.phases.items()}
+            self.marked = now
+        return {"elapsed": elapsed, "phases": dict(sorted(phases.items(), key=lambda kv: -kv[1]["seconds"]))}
+
+    def print_summary(self, summary):
+        print(f"{'Phase':<22} {'s':>9} {'appels':>9} {'µs/appel':>10} {'part':>7}")
+        for name, p in summary["phases"].items():
+            print(f"{name:<22} {p['seconds']:9.2f} {p['calls']:9d} {p['mean_us']:10.1f} {p['share']:6.1%}")
+
+
+def write_json_line(path, record):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+class StackSampler:
+    # Profileur par échantillonnage : un fil lit la pile du fil observé toutes les `interval` secondes
+    # (sys._current_frames), sans instrumenter le code. Les opérations torch relâchent le GIL, elles
+    # sont donc échantillonnées sur la ligne Python qui les a lancées.
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+
+    def summary(self, top=25):
+        own = collections.Counter()
+        inclusive = collections.Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                inclusive[function] += count
+        n = self.samples or 1
+        return {
+            "samples": self.samples, "interval": self.interval,
+            "self": [{"function": f, "samples": c, "share": c / n} for f, c in own.most_common(top)],
+            "total": [{"function": f, "samples": c, "share": c / n} for f, c in inclusive.most_common(top)],
+        }
+
+    def write_collapsed(self, path):
+        # Format « piles repliées » (flamegraph.pl, speedscope)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(";".join(stack) + f" {count}\n")
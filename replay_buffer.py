@@ -0,0 +1,312 @@
+import os
+
+import numpy as np
+import torch
+
+
+class ReplayBuffer:
+    # Tampon circulaire préalloué. Les états (binaires) sont stockés en np.packbits, soit
+    # 230 octets au lieu de 1836 entiers. L'état suivant n'est recopié que s'il diffère de
+    # l'état de la transition suivante (fin d'épisode) : sinon on relit simplement celle-ci.
+    def __init__(self, capacity, state_dim):
+        self.capacity = capacity
+        self.state_dim = state_dim
+        packed_dim = (state_dim + 7) // 8
+        self.states = np.zeros((capacity, packed_dim), dtype=np.uint8)
+        # Pages allouées paresseusement : seules les lignes réellement écrites occupent la RAM
+        self.next_states = np.zeros((capacity, packed_dim), dtype=np.uint8)
+        self.next_is_following = np.zeros(capacity, dtype=bool)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+        # Facteur d'amorçage γ^k de chaque transition (k pas agrégés, voir n_step.py)
+        self.discounts = np.zeros(capacity, dtype=np.float32)
+        self.pos = 0
+        self.size = 0
+        self._pending = None
+        self._batch = None
+        self._weights = None
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done, discount):
+        packed = np.packbits(state)
+        last = (self.pos - 1) % self.capacity
+        if self._pending is not None:
+            if np.array_equal(packed, self._pending):
+                self.next_is_following[last] = True
+            else:
+                self.next_states[last] = self._pending
+                self.next_is_following[last] = False
+        i = self.pos
+        self.states[i] = packed
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.dones[i] = done
+        self.discounts[i] = discount
+        self.next_is_following[i] = False
+        if done:
+            self.next_states[i] = np.packbits(next_state)
+            self._pending = None
+        else:
+            self._pending = np.packbits(next_state)
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        return i
+
+    def _flush_pending(self):
+        # La dernière transition attend encore l'état suivant : on le matérialise pour l'échantillonnage
+        if self._pending is not None:
+            last = (self.pos - 1) % self.capacity
+            self.next_states[last] = self._pending
+            self.next_is_following[last] = False
+
+    def _batch_tensors(self, batch_size):
+        if self._batch is None or len(self._batch[0]) != batch_size:
+            self._batch = (
+                torch.empty((batch_size, self.state_dim), dtype=torch.float32),
+                torch.empty(batch_size, dtype=torch.int64),
+                torch.empty(batch_size, dtype=torch.float32),
+                torch.empty((batch_size, self.state_dim), dtype=torch.float32),
+                torch.empty(batch_size, dtype=torch.float32),
+                torch.empty(batch_size, dtype=torch.float32),
+            )
+        return self._batch
+
+    def sample_indices(self, batch_size):
+        return np.random.randint(0, self.size, size=batch_size)
+
+    def gather(self, idx):
+        # Remplit les tenseurs réutilisables (vues NumPy partagées) ; valides jusqu'au prochain appel
+        self._flush_pending()
+        states_t, actions_t, rewards_t, next_states_t, dones_t, discounts_t = self._batch_tensors(len(idx))
+        following = (idx + 1) % self.capacity
+        next_packed = np.where(self.next_is_following[idx, None], self.states[following], self.next_states[idx])
+        states_t.numpy()[:] = np.unpackbits(self.states[idx], axis=1, count=self.state_dim)
+        next_states_t.numpy()[:] = np.unpackbits(next_packed, axis=1, count=self.state_dim)
+        actions_t.numpy()[:] = self.actions[idx]
+        rewards_t.numpy()[:] = self.rewards[idx]
+        dones_t.numpy()[:] = self.dones[idx]
+        discounts_t.numpy()[:] = self.discounts[idx]
+        return states_t, actions_t, rewards_t, next_states_t, dones_t, discounts_t
+
+    def sample(self, batch_size):
+        # Même signature que PrioritizedReplayBuffer : poids d'importance unitaires
+        idx = self.sample_indices(batch_size)
+        if self._weights is None or len(self._weights) != batch_size:
+            self._weights = torch.ones(batch_size, dtype=torch.float32)
+        return (*self.gather(idx), self._weights, idx)
+
+    def update_priorities(self, idx, td_errors):
+        pass
+
+    def state_dict(self):
+        # Copie des lignes écrites (pour les points de reprise) ; les lignes au-delà de size sont vides
+        n = self.size
+        return {
+            "pos": self.pos, "size": n,
+            "pending": None if self._pending is None else self._pending.copy(),
+            "states": self.states[:n].copy(), "next_states": self.next_states[:n].copy(),
+            "next_is_following": self.next_is_following[:n].copy(), "actions": self.actions[:n].copy(),
+            "rewards": self.rewards[:n].copy(), "dones": self.dones[:n].copy(), "discounts": self.discounts[:n].copy(),
+        }
+
+    def load_state_dict(self, state):
+        n = state["size"]
+        self.pos, self.size, self._pending = state["pos"], n, state["pending"]
+        for name in ("states", "next_states", "next_is_following", "actions", "rewards", "dones", "discounts"):
+            getattr(self, name)[:n] = state[name]
+
+
+class SumTree:
+    # Arbre binaire complet stocké dans un tableau (racine en 1, feuilles en [size, 2 * size)) ;
+    # mises à jour et tirages traités par lots, niveau par niveau.
+    def __init__(self, capacity):
+        self.size = 1
+        while self.size < capacity:
+            self.size *= 2
+        self.tree = np.zeros(2 * self.size, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def update(self, idx, priorities):
+        nodes = np.asarray(idx) + self.size
+        self.tree[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            if nodes[0] == 1:
+                break
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = values.copy()
+        while nodes[0] < self.size:
+            left = 2 * nodes
+            go_right = values >= self.tree[left]
+            values -= np.where(go_right, self.tree[left], 0.0)
+            nodes = left + go_right
+        return nodes - self.size
+
+    def get(self, idx):
+        return self.tree[np.asarray(idx) + self.size]
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    def __init__(self, capacity, state_dim, alpha=0.6, beta=0.4, beta_increment=1e-5, eps=1e-3):
+        super().__init__(capacity, state_dim)
+        self.tree = SumTree(capacity)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+        self.max_priority = 1.0
+
+    def add(self, state, action, reward, next_state, done, discount):
+        i = super().add(state, action, reward, next_state, done, discount)
+        self.tree.update([i], [self.max_priority ** self.alpha])
+        return i
+
+    def sample(self, batch_size):
+        # Tirage stratifié : un tirage uniforme dans chacun des batch_size segments de la masse totale
+        total = self.tree.total()
+        values = (np.arange(batch_size) + np.random.random(batch_size)) * (total / batch_size)
+        idx = np.minimum(self.tree.find(values), self.size - 1)
+        probs = np.maximum(self.tree.get(idx) / total, 1e-12)
+        weights = (self.size * probs) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        if self._weights is None or len(self._weights) != batch_size:
+            self._weights = torch.empty(batch_size, dtype=torch.float32)
+        self._weights.numpy()[:] = weights
+        return (*self.gather(idx), self._weights, idx)
+
+    def state_dict(self):
+        state = super().state_dict()
+        state.update(tree=self.tree.tree.copy(), beta=self.beta, max_priority=self.max_priority)
+        return state
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        self.tree.tree[:] = state["tree"]
+        self.beta, self.max_priority = state["beta"], state["max_priority"]
+
+    def update_priorities(self, idx, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        # En cas d'indices répétés dans le lot, la dernière écriture l'emporte
+        self.tree.update(idx, priorities ** self.alpha)
+
+
+class MemmapReplayBuffer(ReplayBuffer):
+    # Mémoire de rejeu sur disque (np.memmap) : enregistrements de taille fixe, états compressés
+    # en bits, et un petit en-tête qui permet de reprendre après un redémarrage. Le fichier grandit
+    # par doublement jusqu'à `capacity`, puis devient circulaire. Le tirage lit des blocs
+    # contigus de `chunk` transitions pour limiter les accès aléatoires au disque.
+    HEADER_VERSION = 1
+    VERSION, STATE_DIM, CAPACITY, ALLOCATED, POS, SIZE = range(6)
+
+    def __init__(self, path, capacity, state_dim, chunk=8, initial_rows=65536):
+        self.path = path
+        self.state_dim = state_dim
+        self.chunk = chunk
+        packed_dim = (state_dim + 7) // 8
+        self.record = np.dtype([("state", np.uint8, (packed_dim,)), ("next_state", np.uint8, (packed_dim,)),
+                                ("action", np.int16), ("reward", np.float32), ("done", np.uint8),
+                                ("discount", np.float32)])
+        os.makedirs(path, exist_ok=True)
+        header_path = os.path.join(path, "header.bin")
+        self.data_path = os.path.join(path, "transitions.bin")
+        if os.path.exists(header_path):
+            self.header = np.memmap(header_path, dtype=np.int64, mode="r+", shape=(6,))
+            if self.header[self.VERSION] != self.HEADER_VERSION or self.header[self.STATE_DIM] != state_dim:
+                raise ValueError(f"Mémoire de rejeu incompatible dans {path}")
+            # La capacité peut être augmentée à la reprise, jamais réduite
+            grow = capacity > self.header[self.CAPACITY]
+        else:
+            grow = False
+            self.header = np.memmap(header_path, dtype=np.int64, mode="w+", shape=(6,))
+            self.header[:] = (self.HEADER_VERSION, state_dim, capacity, 0, 0, 0)
+        self.capacity = int(self.header[self.CAPACITY])
+        self.records = None
+        self._resize(max(int(self.header[self.ALLOCATED]), min(capacity, initial_rows)))
+        self.pos = int(self.header[self.POS])
+        self.size = int(self.header[self.SIZE])
+        if grow:
+            self._grow(capacity)
+        self._batch = None
+        self._weights = None
+
+    def _grow(self, capacity):
+        # Anneau déjà replié : on remet la plus ancienne transition en ligne 0 avant d'agrandir,
+        # pour que les écritures suivantes reprennent après la plus récente
+        if self.size == self.capacity and self.pos > 0:
+            head = np.array(self.records[:self.pos])
+            self.records[:self.size - self.pos] = self.records[self.pos:self.size]
+            self.records[self.size - self.pos:self.size] = head
+            self.records.flush()
+        self.pos = self.size
+        self.capacity = capacity
+        self.header[self.POS] = self.pos
+        self.header[self.CAPACITY] = capacity
+
+    def _resize(self, rows):
+        if self.records is not None:
+            self.records.flush()
+            self.records = None
+        with open(self.data_path, "ab") as f:
+            f.truncate(rows * self.record.itemsize)
+        self.records = np.memmap(self.data_path, dtype=self.record, mode="r+", shape=(rows,))
+        self.header[self.ALLOCATED] = rows
+
+    def add(self, state, action, reward, next_state, done, discount):
+        i = self.pos
+        if i >= len(self.records):
+            self._resize(min(self.capacity, 2 * len(self.records)))
+        rec = self.records[i]
+        rec["state"] = np.packbits(state)
+        rec["next_state"] = np.packbits(next_state)
+        rec["action"] = action
+        rec["reward"] = reward
+        rec["done"] = done
+        rec["discount"] = discount
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.header[self.POS] = self.pos
+        self.header[self.SIZE] = self.size
+        return i
+
+    def sample_indices(self, batch_size):
+        # batch_size / chunk blocs contigus (repliés modulo la taille remplie)
+        starts = np.random.randint(0, self.size, size=-(-batch_size // self.chunk))
+        idx = (starts[:, None] + np.arange(self.chunk)) % self.size
+        return np.sort(idx.ravel()[:batch_size])
+
+    def gather(self, idx):
+        states_t, actions_t, rewards_t, next_states_t, dones_t, discounts_t = self._batch_tensors(len(idx))
+        rec = self.records[idx]
+        states_t.numpy()[:] = np.unpackbits(rec["state"], axis=1, count=self.state_dim)
+        next_states_t.numpy()[:] = np.unpackbits(rec["next_state"], axis=1, count=self.state_dim)
+        actions_t.numpy()[:] = rec["action"]
+        rewards_t.numpy()[:] = rec["reward"]
+        dones_t.numpy()[:] = rec["done"]
+        discounts_t.numpy()[:] = rec["discount"]
+        return states_t, actions_t, rewards_t, next_states_t, dones_t, discounts_t
+
+    def flush(self):
+        self.records.flush()
+        self.header.flush()
+
+    def state_dict(self):
+        # Les transitions restent dans le fichier : seule la position est sauvegardée. La reprise est
+        # exacte tant que l'anneau n'a pas été réécrit depuis le point de reprise.
+        self.flush()
+        return {"pos": self.pos, "size": self.size}
+
+    def load_state_dict(self, state):
+        self.pos, self.size = state["pos"], state["size"]
+        self.header[self.POS] = self.pos
+        self.header[self.SIZE] = self.size
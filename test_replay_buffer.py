@@ -0,0 +1,35 @@
+import numpy as np
+
+from replay_buffer import MemmapReplayBuffer
+
+STATE_DIM = 12
+
+
+def add_transitions(buffer, start, count):
+    for action in range(start, start + count):
+        state = np.zeros(STATE_DIM, dtype=np.int8)
+        state[action % STATE_DIM] = 1
+        buffer.add(state, action, float(action), state, False, 0.99)
+
+
+def test_resume(tmp_path):
+    buffer = MemmapReplayBuffer(str(tmp_path), 20, STATE_DIM, initial_rows=4)
+    add_transitions(buffer, 0, 10)
+    buffer.flush()
+    reopened = MemmapReplayBuffer(str(tmp_path), 20, STATE_DIM)
+    assert (reopened.pos, reopened.size) == (10, 10)
+    assert reopened.records["action"][:10].tolist() == list(range(10))
+
+
+def test_wrap_then_reopen_larger(tmp_path):
+    buffer = MemmapReplayBuffer(str(tmp_path), 20, STATE_DIM, initial_rows=4)
+    add_transitions(buffer, 0, 30)
+    buffer.flush()
+    reopened = MemmapReplayBuffer(str(tmp_path), 40, STATE_DIM)
+    # Les 20 transitions gardées (10 à 29) sont remises dans l'ordre, la suivante s'écrit après
+    assert (reopened.capacity, reopened.pos, reopened.size) == (40, 20, 20)
+    add_transitions(reopened, 30, 1)
+    assert (reopened.pos, reopened.size) == (21, 21)
+    assert reopened.records["action"][:21].tolist() == list(range(10, 31))
+    states, actions, *_ = reopened.sample(64)
+    assert actions.min() >= 10 and actions.max() <= 30
@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+
+from main import HYPERPARAMETRES, entrainer_agent
+from metrics import MetricsWriter
+
+
+def main():
+    # Entraînement sans interaction ni matplotlib : tout est écrit sous --out
+    # (metrics.jsonl, config.json, checkpoint.pt, model.pth, profils/)
+    parser = argparse.ArgumentParser(description="Entraînement non interactif du DQN")
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--out", default="runs/entrainement")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--actors", type=int, default=0, help="processus acteurs (entraînement parallèle)")
+    parser.add_argument("--encoder", default="full27")
+    parser.add_argument("--n-step", type=int, default=1)
+    parser.add_argument("--update-every", type=int, default=1)
+    parser.add_argument("--gradient-steps", type=int, default=1)
+    parser.add_argument("--replay-path", default=None, help="mémoire de rejeu sur disque")
+    for name, value in HYPERPARAMETRES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--checkpoint-every", type=int, default=None,
+                        help="0 : aucun point de reprise (100 par défaut, 0 avec --actors)")
+    parser.add_argument("--resume", action="store_true", help="reprend depuis OUT/checkpoint.pt")
+    parser.add_argument("--profile", action="store_true", help="temps par phase dans OUT/profils/phases.jsonl")
+    parser.add_argument("--profile-episodes", default="", help="épisodes à échantillonner, ex. 10,500")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+    if args.update_every < 1 or args.gradient_steps < 1:
+        parser.error("--update-every et --gradient-steps doivent valoir au moins 1")
+    if args.actors > 0:
+        # Le mode parallèle n'a ni point de reprise ni profileur
+        for option, valeur in (("--checkpoint-every", args.checkpoint_every), ("--resume", args.resume),
+                               ("--profile", args.profile), ("--profile-episodes", args.profile_episodes)):
+            if valeur:
+                parser.error(f"{option} n'est pas disponible avec --actors")
+        args.checkpoint_every = 0
+    elif args.checkpoint_every is None:
+        args.checkpoint_every = 100
+
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "config.json"), "w") as f:
+        json.dump(vars(args), f, indent=2)
+    journal = MetricsWriter(os.path.join(args.out, "metrics.jsonl"), append=args.resume)
+    try:
+        entrainer_agent(
+            episodes=args.episodes, acteurs=args.actors, n_pas=args.n_step, chemin_rejeu=args.replay_path,
+            apprendre_tous_les=args.update_every, pas_gradient=args.gradient_steps, encodeur=args.encoder,
+            chemin_checkpoint=os.path.join(args.out, "checkpoint.pt"), checkpoint_tous_les=args.checkpoint_every,
+            reprendre=args.resume, profiler=args.profile,
+            episodes_echantillonnes={int(e) for e in args.profile_episodes.split(",") if e},
+            dossier_profil=os.path.join(args.out, "profils"),
+            hyperparametres={name: getattr(args, name) for name in HYPERPARAMETRES},
+            graine=args.seed, journal=journal, dossier_modele=args.out, verbeux=not args.quiet)
+    finally:
+        journal.close()
+
+
+if __name__ == "__main__":
+    main()